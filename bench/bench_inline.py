@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from textnode import *
+
+def old_text_to_textnodes(text):
+    # the five-pass pipeline text_to_textnodes used before tokenize_inline
+    nodes = [TextNode(text, text_type_text)]
+    nodes = split_nodes_delimiter(nodes, bold_delimiter, text_type_bold)
+    nodes = split_nodes_delimiter(nodes, italic_delimiter, text_type_italic)
+    nodes = split_nodes_delimiter(nodes, code_delimiter, text_type_code)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+corpora = {
+    "link-heavy": "see [page {i}](/docs/page-{i}) and ![figure {i}](/images/{i}.png) ",
+    "emphasis-heavy": "some **bold {i}** and *italic {i}* with `code {i}` here ",
+    "plain": "a paragraph of ordinary prose without any markup in it at all {i} ",
+}
+
+def throughput(fn, text, min_time=0.5):
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return len(text) * runs / elapsed / 1e6
+
+def main():
+    spans = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), spans * 8))
+    print(f"{'corpus':<16}{'size':>10}{'old MB/s':>12}{'new MB/s':>12}")
+    for name, piece in corpora.items():
+        text = "".join(piece.format(i=i) for i in range(spans))
+        assert old_text_to_textnodes(text) == tokenize_inline(text)
+        old, new = throughput(old_text_to_textnodes, text), throughput(tokenize_inline, text)
+        print(f"{name:<16}{len(text):>10}{old:>12.2f}{new:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from textnode import markdown_to_html_node, text_to_textnodes
+from main import generate_page, stream_page
+
+def corpus(pages):
+    paragraph = "Some **bold {i}** text, *italic {i}*, `code {i}` and a [link {i}](/page/{i}) with ![img {i}](/img/{i}.png)."
+    blocks = []
+    for i in range(pages):
+        blocks.append(f"# Page {i}")
+        blocks.append("\n".join(paragraph.format(i=i * 10 + j) for j in range(5)))
+        blocks.append("\n".join(f"* item {j} with [x](/x/{j})" for j in range(5)))
+        blocks.append(f"```code block {i}```")
+    return "\n\n".join(blocks)
+
+def count_nodes(node):
+    count, stack = 0, [node]
+    while stack:
+        item = stack.pop()
+        count += 1
+        stack.extend(item.children or [])
+    return count
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def measure_peak(build):
+    tracemalloc.start()
+    build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def streaming(sizes):
+    # peak memory of rendering one page whole and streamed, for growing pages
+    with tempfile.TemporaryDirectory() as tmp:
+        src, template, dest = os.path.join(tmp, "page.md"), os.path.join(tmp, "template.html"), os.path.join(tmp, "page.html")
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        for pages in sizes:
+            with open(src, "w") as f:
+                f.write(corpus(pages))
+            size = os.path.getsize(src)
+            whole = measure_peak(lambda: generate_page(src, template, dest))
+            streamed = measure_peak(lambda: stream_page(src, template, dest))
+            print(f"{size:>12} bytes of markdown: {whole:>12} bytes peak whole, {streamed:>9} bytes peak streamed")
+
+def main():
+    if sys.argv[1:2] == ["stream"]:
+        return streaming([int(pages) for pages in sys.argv[2:]] or [500, 2000, 8000])
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    markdown = corpus(pages)
+
+    node, html_bytes = measure(lambda: markdown_to_html_node(markdown))
+    html_nodes = count_nodes(node)
+    text_nodes, text_bytes = measure(lambda: text_to_textnodes(markdown.replace("\n", " ")))
+
+    print(f"corpus: {len(markdown)} bytes of markdown")
+    print(f"HTMLNode tree: {html_nodes} nodes, {html_bytes} bytes, {html_bytes / html_nodes:.1f} bytes/node")
+    print(f"TextNode list: {len(text_nodes)} nodes, {text_bytes} bytes, {text_bytes / len(text_nodes):.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
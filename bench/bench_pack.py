@@ -0,0 +1,68 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from corpus import generate, add_arguments, corpus_options
+from loadtest import load, start_server, server_arguments, site_paths
+from main import build
+from pack import write_pack
+
+def best_of(fn, repeat, setup):
+    best = float("inf")
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def count_files(directory):
+    return sum(len(names) for _, _, names in os.walk(directory))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the directory layout of a built site with a pack: deploy time and request latency")
+    add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--port", type=int, default=8911)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate(root, **corpus_options(args))
+        public, pack_path = os.path.join(root, "public"), os.path.join(root, "site.pack")
+        with contextlib.redirect_stdout(io.StringIO()):
+            build(os.path.join(root, "static"), os.path.join(root, "content"), os.path.join(root, "template.html"), public, os.path.join(root, ".cache", "manifest.json"), compress=True)
+        start = time.perf_counter()
+        stats = write_pack(public, pack_path)
+        print(f"{count_files(public)} files in public/, packed into {stats['bytes']} bytes in {time.perf_counter() - start:.3f}s")
+
+        # deploy: the whole output copied to a fresh location, as a sync to an empty target does
+        target = os.path.join(root, "deployed")
+        reset = lambda: shutil.rmtree(target, True)
+        tree = best_of(lambda: shutil.copytree(public, target), args.repeat, reset)
+        packed = best_of(lambda: (os.makedirs(target), shutil.copy2(pack_path, target)), args.repeat, reset)
+        print(f"{'deploy':<12}{'directory':>12}{tree:>10.3f}s{'pack':>8}{packed:>10.3f}s{tree / packed:>8.1f}x")
+
+        paths = [path for path in site_paths(public) if not path.endswith((".gz", ".br"))]
+        print(f"{'mode':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for offset, mode in enumerate(["production", "pack"]):
+            port = args.port + offset
+            process = start_server(port, public, server_arguments(mode, pack_path))
+            try:
+                result = load("127.0.0.1", port, paths, args.concurrency, args.duration)
+            finally:
+                process.kill()
+                process.wait()
+            print(f"{mode:<12}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.0f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
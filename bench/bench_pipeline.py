@@ -0,0 +1,50 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from corpus import generate, add_arguments, corpus_options
+import main
+
+def with_latency(seconds):
+    # stands in for a network filesystem: every file the build opens for a
+    # page read or write waits first
+    def slow_open(*args, **kwargs):
+        time.sleep(seconds)
+        return open(*args, **kwargs)
+    return slow_open
+
+def timed_build(root, pipeline):
+    shutil.rmtree(os.path.join(root, "public"), True)
+    shutil.rmtree(os.path.join(root, ".cache"), True)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.build(os.path.join(root, "static"), os.path.join(root, "content"), os.path.join(root, "template.html"), os.path.join(root, "public"), os.path.join(root, ".cache", "manifest.json"), force=True, pipeline=pipeline)
+    return time.perf_counter() - start
+
+def run():
+    parser = argparse.ArgumentParser(description="Time a serial build against --pipeline with simulated storage latency")
+    add_arguments(parser)
+    parser.add_argument("--latency", type=float, default=2, help="milliseconds added to every file opened for a page")
+    parser.add_argument("--threads", type=int, nargs="+", default=[2, 4, 8, 16])
+    args = parser.parse_args()
+
+    main.open = with_latency(args.latency / 1000)
+    with tempfile.TemporaryDirectory() as root:
+        generate(root, **corpus_options(args))
+        serial = timed_build(root, 0)
+        print(f"{args.pages} pages, {args.latency} ms per open")
+        print(f"{'serial':<14}{serial:>10.3f}s")
+        for threads in args.threads:
+            seconds = timed_build(root, threads)
+            print(f"{f'pipeline {threads}':<14}{seconds:>10.3f}s{serial / seconds:>8.2f}x")
+
+
+if __name__ == "__main__":
+    run()
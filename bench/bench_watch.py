@@ -0,0 +1,65 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from corpus import generate, add_arguments, corpus_options
+from watch import watch
+
+def edit(path):
+    # in place, as most editors save, so the directory mtime does not change
+    with open(path, "a") as f:
+        f.write("\nedited\n")
+
+def measure(root, scan_share, edits, idle):
+    # seconds from each save until watch delivers it, and the share of a core
+    # the watcher takes while nothing changes
+    paths = [os.path.join(root, "static"), os.path.join(root, "content"), os.path.join(root, "template.html")]
+    pages = sorted(os.path.join(dirpath, name) for dirpath, _, names in os.walk(paths[1]) for name in names)
+    delivered, stop = threading.Event(), threading.Event()
+    thread = threading.Thread(target=watch, args=(paths, lambda changed: delivered.set()), kwargs={"stop": stop, "scan_share": scan_share})
+    thread.start()
+    time.sleep(1)
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    time.sleep(idle)
+    busy = (time.process_time() - cpu) / (time.perf_counter() - wall)
+
+    rng = random.Random(0)
+    first, repeat = [], []
+    for _ in range(edits):
+        page = rng.choice(pages)
+        for latencies in [first, repeat]:
+            delivered.clear()
+            start = time.perf_counter()
+            edit(page)
+            delivered.wait()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.1)
+    stop.set()
+    thread.join()
+    return busy, first, repeat
+
+def run():
+    parser = argparse.ArgumentParser(description="Time how long watch takes to notice an edit, and what it costs while idle")
+    add_arguments(parser)
+    parser.add_argument("--edits", type=int, default=5)
+    parser.add_argument("--idle", type=float, default=5, help="seconds of idle watching to measure the polling cost over")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate(root, **corpus_options(args))
+        print(f"{args.pages} pages; latency from save to delivery, mean and max")
+        print(f"{'scan':<12}{'idle cpu':>10}{'first edit':>22}{'same page again':>22}")
+        for label, scan_share in [("every poll", float("inf")), ("adaptive", 0.2)]:
+            busy, first, repeat = measure(root, scan_share, args.edits, args.idle)
+            print(f"{label:<12}{busy:>9.0%} {sum(first) / len(first):>10.3f}s {max(first):>9.3f}s {sum(repeat) / len(repeat):>10.3f}s {max(repeat):>9.3f}s")
+
+
+if __name__ == "__main__":
+    run()
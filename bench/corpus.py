@@ -0,0 +1,114 @@
+import argparse
+import os
+import random
+
+# list and quote blocks are split on "-", digits and ">" by the block
+# renderers, so generated list items stick to letters and spaces, and
+# paragraph lines start with a plain word so "**" is not read as a list
+words = "the a of river mountain hobbit ring shire elf dwarf wizard road tower forest king stone light shadow song fire water".split()
+
+block_kinds = ["paragraph", "heading", "code", "quote", "unordered_list", "ordered_list"]
+default_mix = {"paragraph": 6, "heading": 2, "code": 1, "quote": 1, "unordered_list": 1, "ordered_list": 1}
+
+def phrase(rng, count):
+    return " ".join(rng.choice(words) for _ in range(count))
+
+def inline_text(rng, count, density, page):
+    # density is the chance that a word becomes a span instead of plain text
+    parts = [rng.choice(words)]
+    for i in range(count):
+        if rng.random() >= density:
+            parts.append(rng.choice(words))
+            continue
+        kind = rng.randrange(5)
+        word = rng.choice(words)
+        if kind == 0:
+            parts.append(f"**{word}**")
+        elif kind == 1:
+            parts.append(f"*{word}*")
+        elif kind == 2:
+            parts.append(f"`{word}`")
+        elif kind == 3:
+            parts.append(f"[{word}](/page/{page}/{i})")
+        else:
+            parts.append(f"![{word}](/images/{word}.png)")
+    return " ".join(parts)
+
+def block(rng, kind, density, page):
+    if kind == "heading":
+        return "#" * rng.randint(2, 6) + " " + phrase(rng, 4)
+    elif kind == "code":
+        return "```\n" + "\n".join(f"line {i} = {phrase(rng, 3)!r}" for i in range(rng.randint(3, 12))) + "\n```"
+    elif kind == "quote":
+        return "\n".join(">" + phrase(rng, 8) for _ in range(rng.randint(1, 4)))
+    elif kind == "unordered_list":
+        return "\n".join("* " + phrase(rng, 5) for _ in range(rng.randint(2, 8)))
+    elif kind == "ordered_list":
+        return "\n".join(f"{i + 1}. " + phrase(rng, 5) for i in range(rng.randint(2, 8)))
+    return "\n".join(inline_text(rng, rng.randint(10, 40), density, page) for _ in range(rng.randint(1, 5)))
+
+def page(rng, index, blocks, mix, density, pathological):
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    parts = [f"# Page {index} {phrase(rng, 3)}"]
+    for kind in rng.choices(kinds, weights, k=blocks):
+        parts.append(block(rng, kind, density, index))
+    if pathological:
+        parts.append("links " + " ".join(f"[link {i}](/links/{i})" for i in range(pathological)))
+        parts.append("emphasis " + " ".join(f"**{rng.choice(words)}** *{rng.choice(words)}*" for _ in range(pathological)))
+    return "\n\n".join(parts) + "\n"
+
+def page_path(rng, index, depth):
+    dirs = [f"section{rng.randrange(4)}" for _ in range(rng.randint(0, depth))]
+    return os.path.join(*dirs, f"page{index}", "index.md")
+
+def generate(dest, pages=100, depth=3, blocks=20, mix=None, density=0.2, pathological=0, seed=0):
+    # same arguments and seed, same bytes on every machine
+    rng = random.Random(seed)
+    mix = mix or default_mix
+    content = os.path.join(dest, "content")
+    written = 0
+    for index in range(pages):
+        path = os.path.join(content, page_path(rng, index, depth))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        text = page(rng, index, blocks, mix, density, pathological)
+        with open(path, "w") as f:
+            f.write(text)
+        written += len(text)
+
+    os.makedirs(os.path.join(dest, "static"), exist_ok=True)
+    with open(os.path.join(dest, "static", "index.css"), "w") as f:
+        f.write("body {\n    margin: 0 auto;\n    max-width: 40em;\n}\n")
+    with open(os.path.join(dest, "template.html"), "w") as f:
+        f.write("<!DOCTYPE html>\n<html>\n<head>\n    <title> {{ Title }} </title>\n    <link href=\"/index.css\" rel=\"stylesheet\">\n</head>\n<body>\n    <article>\n        {{ Content }}\n    </article>\n</body>\n</html>\n")
+    return written
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        if kind not in block_kinds:
+            raise argparse.ArgumentTypeError(f"unknown block kind {kind}, expected one of {', '.join(block_kinds)}")
+        mix[kind] = float(weight)
+    return mix
+
+def add_arguments(parser):
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=3, help="maximum directory nesting above each page")
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--mix", type=parse_mix, default=None, help="block weights, e.g. paragraph=6,code=1,heading=2")
+    parser.add_argument("--density", type=float, default=0.2, help="share of inline words that are emphasis, code, links or images")
+    parser.add_argument("--pathological", type=int, default=0, help="append a paragraph with this many links and one with as many emphasis spans to every page")
+    parser.add_argument("--seed", type=int, default=0)
+
+def corpus_options(args):
+    return {"pages": args.pages, "depth": args.depth, "blocks": args.blocks, "mix": args.mix, "density": args.density, "pathological": args.pathological, "seed": args.seed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic site (content/, static/, template.html)")
+    parser.add_argument("dest")
+    add_arguments(parser)
+    args = parser.parse_args()
+    size = generate(args.dest, **corpus_options(args))
+    print(f"Wrote {args.pages} pages, {size} bytes of markdown, to {args.dest}")
@@ -0,0 +1,99 @@
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def worker(host, port, paths, deadline, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            errors.append(path)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+def load(host, port, paths, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=worker, args=(host, port, paths, deadline, latencies, errors)) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float("nan")
+    return {"requests": len(latencies), "errors": len(errors), "rps": len(latencies) / duration, "p50_ms": percentile(0.5), "p99_ms": percentile(0.99)}
+
+def start_server(port, directory, extra):
+    process = subprocess.Popen([sys.executable, os.path.join(root, "server.py"), "--dir", directory, "--port", str(port)] + extra, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            http.client.HTTPConnection("127.0.0.1", port, timeout=1).request("HEAD", "/")
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise SystemExit(f"server on port {port} did not start")
+
+def server_arguments(mode, pack=None):
+    if mode == "default":
+        return []
+    if mode == "pack":
+        return ["--pack", pack]
+    return [f"--{mode}"]
+
+def site_paths(directory):
+    paths = []
+    for dirpath, _, names in os.walk(directory):
+        for name in names:
+            rel = os.path.relpath(os.path.join(dirpath, name), directory)
+            paths.append("/" + rel.replace(os.sep, "/"))
+    return sorted(paths)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test server.py: requests per second and latency percentiles")
+    parser.add_argument("--dir", default=os.path.join(root, "public"), help="built site to serve")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--modes", default="default,production", help="comma-separated server modes to compare: default, production, pack")
+    parser.add_argument("--pack", help="pack of the same site for the pack mode, written by src/main.py --pack")
+    args = parser.parse_args()
+    if "pack" in args.modes.split(",") and not args.pack:
+        parser.error("the pack mode needs --pack")
+
+    paths = site_paths(args.dir)
+    print(f"{len(paths)} paths, {args.concurrency} clients, {args.duration}s per mode")
+    print(f"{'mode':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for offset, mode in enumerate(args.modes.split(",")):
+        port = args.port + offset
+        process = start_server(port, args.dir, server_arguments(mode, args.pack))
+        try:
+            result = load("127.0.0.1", port, paths, args.concurrency, args.duration)
+        finally:
+            process.kill()
+            process.wait()
+        print(f"{mode:<12}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.0f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
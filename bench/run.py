@@ -0,0 +1,134 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from corpus import generate, add_arguments, corpus_options
+from main import build, find_pages
+from template import load_template
+from textnode import markdown_to_blocks, markdown_to_html_node, text_to_textnodes, scan_blocks, block_type_paragraph
+
+def best_of(fn, repeat, setup=None):
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_phases(root, repeat, jobs):
+    pages = find_pages(os.path.join(root, "content"), os.path.join(root, "public"))
+    docs = []
+    for src, _ in pages:
+        with open(src) as f:
+            docs.append(f.read())
+    size = sum(len(doc) for doc in docs)
+    inline = [block.text for doc in docs for block in scan_blocks(doc) if block.block_type == block_type_paragraph]
+    nodes = [markdown_to_html_node(doc) for doc in docs]
+    htmls = [node.to_html() for node in nodes]
+    template = load_template(os.path.join(root, "template.html"))
+    rendered = [template.render({"Title": "Title", "Content": html}) for html in htmls]
+    out = os.path.join(root, "written")
+
+    def write_all():
+        os.makedirs(out, exist_ok=True)
+        for i, text in enumerate(rendered):
+            with open(os.path.join(out, f"{i}.html"), "w") as f:
+                f.write(text)
+
+    def clean_build():
+        shutil.rmtree(os.path.join(root, "public"), True)
+        shutil.rmtree(os.path.join(root, ".cache"), True)
+
+    def full_build(jobs):
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                build(os.path.join(root, "static"), os.path.join(root, "content"), os.path.join(root, "template.html"), os.path.join(root, "public"), os.path.join(root, ".cache", "manifest.json"), force=True, jobs=jobs)
+        return run
+
+    phases = {
+        "markdown_to_blocks": (lambda: [markdown_to_blocks(doc) for doc in docs], None, size),
+        "text_to_textnodes": (lambda: [text_to_textnodes(text) for text in inline], None, sum(map(len, inline))),
+        "markdown_to_html_node": (lambda: [markdown_to_html_node(doc) for doc in docs], None, size),
+        "to_html": (lambda: [node.to_html() for node in nodes], None, sum(map(len, htmls))),
+        "template_fill": (lambda: [template.render({"Title": "Title", "Content": html}) for html in htmls], None, sum(map(len, rendered))),
+        "file_write": (write_all, lambda: shutil.rmtree(out, True), sum(map(len, rendered))),
+        "build": (full_build(1), clean_build, size),
+    }
+    if jobs > 1:
+        phases[f"build_jobs{jobs}"] = (full_build(jobs), clean_build, size)
+
+    results = {}
+    for name, (fn, setup, nbytes) in phases.items():
+        seconds = best_of(fn, repeat, setup)
+        results[name] = {"seconds": seconds, "mb_per_s": nbytes / seconds / 1e6}
+    return results, len(docs), size
+
+def compare(results, baseline, threshold):
+    # a phase regresses when it is slower than the baseline by more than threshold
+    regressions = []
+    print(f"{'phase':<24}{'baseline s':>12}{'current s':>12}{'change':>10}")
+    for name, result in results["phases"].items():
+        old = baseline["phases"].get(name)
+        if not old:
+            print(f"{name:<24}{'-':>12}{result['seconds']:>12.4f}{'new':>10}")
+            continue
+        change = result["seconds"] / old["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<24}{old['seconds']:>12.4f}{result['seconds']:>12.4f}{change:>+10.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each build phase on a seeded synthetic corpus")
+    add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per phase, the fastest is reported")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="also time a --jobs build with this many processes")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown that counts as a regression, 0.1 is 10%%")
+    args = parser.parse_args()
+
+    options = corpus_options(args)
+    with tempfile.TemporaryDirectory() as root:
+        generate(root, **options)
+        phases, pages, size = run_phases(root, args.repeat, args.jobs)
+
+    results = {
+        "meta": {"corpus": options, "pages": pages, "markdown_bytes": size, "repeat": args.repeat, "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "phases": phases,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["corpus"] != results["meta"]["corpus"]:
+            print("warning: baseline was generated from a different corpus")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            raise SystemExit(f"regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return
+
+    print(f"{pages} pages, {size} bytes of markdown")
+    print(f"{'phase':<24}{'seconds':>12}{'MB/s':>10}")
+    for name, result in phases.items():
+        print(f"{name:<24}{result['seconds']:>12.4f}{result['mb_per_s']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
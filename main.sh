@@ -1,2 +1,3 @@
-python3 src/main.py
+python3 src/client.py "$@"
+# python3 src/daemon.py
 # python3 server.py --dir public
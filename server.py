@@ -1,31 +1,385 @@
 import os
+import sys
 import argparse
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import functools
+import hashlib
+import logging
+import threading
+import urllib.parse
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import HTTPServer, ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from assets import fingerprint_pattern
+from pack import Pack
+
+live_reload_path = "/__livereload"
+live_reload_script = b'<script>new EventSource("/__livereload").onmessage = () => location.reload()</script>'
+
+precompressed_encodings = [("br", ".br"), ("gzip", ".gz")]
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) == 0:
+                continue
+        except ValueError:
+            pass
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class LiveReload:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
 
 
 class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
+    response_code = None
+
+    def send_response(self, code, message=None):
+        self.response_code = code
+        super().send_response(code, message)
+
     def end_headers(self):
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "*")
+        # a fingerprinted name (index.3f9a1c2b.css) changes whenever its content does
+        if self.response_code in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED) and fingerprint_pattern.search(self.path.split("?", 1)[0]):
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
         super().end_headers()
 
     def do_OPTIONS(self):
         self.send_response(200, "OK")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
+    @property
+    def live_reload(self):
+        return getattr(self.server, "live_reload", None)
+
+    def do_GET(self):
+        if self.live_reload:
+            if self.path == live_reload_path:
+                return self.send_events()
+            if self.send_html_with_reload():
+                return
+        super().do_GET()
+
+    def precompressed(self, path):
+        # a .br/.gz sibling written at build time, if the client accepts it
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        for encoding, suffix in precompressed_encodings:
+            if (encoding in accepted or "*" in accepted) and os.path.isfile(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not os.path.isfile(path):
+            return super().send_head()
+        sibling, encoding = self.precompressed(path)
+        if not encoding:
+            return super().send_head()
+
+        f = open(sibling, "rb")
+        fs = os.fstat(f.fileno())
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Encoding", encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(fs.st_size))
+        self.send_header("Last-Modified", self.date_time_string(int(fs.st_mtime)))
+        self.end_headers()
+        return f
+
+    def send_events(self):
+        # Server-Sent Events: one "reload" message per rebuild, comments in
+        # between so dead connections are noticed and dropped
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = self.live_reload.version
+        try:
+            while True:
+                latest = self.live_reload.wait(version, 15)
+                self.wfile.write(b"data: reload\n\n" if latest != version else b": ping\n\n")
+                self.wfile.flush()
+                version = latest
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def send_html_with_reload(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not (path.endswith(".html") and os.path.isfile(path)):
+            return False
+
+        with open(path, "rb") as f:
+            body = f.read()
+        idx = body.rfind(b"</body>")
+        body = body[:idx] + live_reload_script + body[idx:] if idx != -1 else body + live_reload_script
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+        return True
+
+
+class FileCache:
+    # LRU of whole file bodies bounded by total bytes; an entry is reused only
+    # while the file's inode, size and mtime are unchanged
+    def __init__(self, max_bytes=64 << 20, max_entry_bytes=1 << 20):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path, st):
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == key:
+                self.entries.move_to_end(path)
+                return entry[1], entry[2]
+
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old:
+                self.size -= len(old[1])
+            self.entries[path] = (key, body, etag)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        return body, etag
+
+
+class ProductionHTTPRequestHandler(CORSHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive; every response below sets Content-Length
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; with Nagle on, a kept-alive
+    # connection stalls on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.serve(head=False)
+
+    def do_HEAD(self):
+        self.serve(head=True)
+
+    def send_not_modified(self, etag):
+        if etag not in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            return False
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header("ETag", etag)
+        self.end_headers()
+        return True
+
+    def send_redirect(self, location):
+        self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def serve(self, head):
+        url_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not url_path.endswith("/"):
+                # redirect to the slash-terminated URL, same as the default handler
+                return super().do_GET() if not head else super().do_HEAD()
+            path = os.path.join(path, "index.html")
+        if not os.path.isfile(path):
+            return self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+        content_type = self.guess_type(path)
+        path, encoding = self.precompressed(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+
+        cache = self.server.file_cache
+        if st.st_size <= cache.max_entry_bytes:
+            body, etag = cache.get(path, st)
+        else:
+            body, etag = None, f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+        if self.send_not_modified(etag):
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(st.st_size if body is None else len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(int(st.st_mtime)))
+        self.end_headers()
+        if head:
+            return
+        if body is not None:
+            self.wfile.write(body)
+            return
+        with open(path, "rb") as f:
+            self.wfile.flush()
+            self.connection.sendfile(f)
+
+
+class PackHTTPRequestHandler(ProductionHTTPRequestHandler):
+    # serves a site packed by src/pack.py: no open or stat per request, the
+    # body is a slice of the mmapped pack handed straight to the socket
+    def serve(self, head):
+        url_path = urllib.parse.unquote(self.path.split("?", 1)[0].split("#", 1)[0])
+        pack = self.server.pack
+        entry = pack.find(url_path + "index.html" if url_path.endswith("/") else url_path)
+        if entry is None:
+            if not url_path.endswith("/") and pack.find(url_path + "/index.html"):
+                return self.send_redirect(url_path + "/")
+            return self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        encoding = next((encoding for encoding, _ in precompressed_encodings if encoding in entry.bodies and (encoding in accepted or "*" in accepted)), None)
+        etag = f'"{entry.etag}-{encoding}"' if encoding else f'"{entry.etag}"'
+        if self.send_not_modified(etag):
+            return
+
+        body = pack.body(entry, encoding or "identity")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(entry.path))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if len(entry.bodies) > 1:
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(entry.mtime // 1_000_000_000))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+class RenderHTTPRequestHandler(ProductionHTTPRequestHandler):
+    # pages are rendered from content/ when requested (src/ondemand.py),
+    # everything else is served from the directory as in --production
+    def serve(self, head):
+        url_path = urllib.parse.unquote(self.path.split("?", 1)[0].split("#", 1)[0])
+        site = self.server.site
+        src = site.source_for(url_path)
+        if src is None:
+            if site.is_section(url_path):
+                return self.send_redirect(url_path + "/")
+            return super().serve(head)
+        try:
+            page = site.page(src)
+        except Exception as e:
+            return self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{src}: {type(e).__name__}: {e}")
+        if self.send_not_modified(page.etag):
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(page.body)))
+        self.send_header("ETag", page.etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head:
+            self.wfile.write(page.body)
+
+
+class ProductionHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, cache_bytes=64 << 20):
+        super().__init__(server_address, handler_class)
+        self.file_cache = FileCache(cache_bytes)
+
+
+def start_watching(live_reload):
+    # rebuilds with the same relative paths as main.sh, so run from the project root
+    from main import build, watch_and_build, manifest_path, block_cache_path
+    from cache import BlockCache
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    cache = BlockCache(block_cache_path)
+    build("static", "content", "template.html", "public", manifest_path, cache=cache)
+    thread = threading.Thread(
+        target=watch_and_build,
+        args=("static", "content", "template.html", "public", manifest_path),
+        kwargs={"cache": cache, "on_rebuild": lambda summary: live_reload.notify()},
+        daemon=True,
+    )
+    thread.start()
+
 
 def run(
     server_class=HTTPServer,
     handler_class=CORSHTTPRequestHandler,
     port=8000,
     directory=None,
+    watch=False,
+    production=False,
+    pack=None,
+    render=False,
 ):
-    if directory:  # Change the current working directory if directory is specified
-        os.chdir(directory)
+    if production or pack or render:
+        server_class, handler_class = ProductionHTTPServer, ProductionHTTPRequestHandler
+    if pack:
+        handler_class, directory = PackHTTPRequestHandler, None
+    if render:
+        # relative to the project root like main.sh; other files come from static/
+        from ondemand import OnDemandSite
+
+        handler_class, directory = RenderHTTPRequestHandler, "static"
+    if watch:
+        # the event stream holds its connection open, so requests need their own threads
+        server_class = ThreadingHTTPServer
+    # serve directory without changing the working directory, the watcher builds relative to it
+    handler = functools.partial(handler_class, directory=directory) if directory else handler_class
     server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
-    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
+    httpd = server_class(server_address, handler)
+    if watch:
+        httpd.live_reload = LiveReload()
+        start_watching(httpd.live_reload)
+    if render:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        httpd.site = OnDemandSite()
+        print(f"Serving HTTP on http://localhost:{port}, rendering pages from 'content' on request...")
+    elif pack:
+        httpd.pack = Pack(pack)
+        print(f"Serving HTTP on http://localhost:{port} from pack '{pack}' ({httpd.pack.count} files)...")
+    else:
+        print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
     httpd.serve_forever()
 
 
@@ -35,6 +389,28 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Rebuild on changes to content/, static/ and template.html and live-reload open pages",
+    )
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="Threaded server with keep-alive, an in-memory file cache, ETags and sendfile",
+    )
+    parser.add_argument(
+        "--pack",
+        metavar="FILE",
+        help="Serve the site from a pack written by src/main.py --pack instead of --dir",
+    )
+    parser.add_argument(
+        "--render",
+        action="store_true",
+        help="Render pages from content/ and template.html when requested instead of serving a build; other files come from static/",
+    )
     args = parser.parse_args()
+    if sum([args.watch, args.production, bool(args.pack), args.render]) > 1:
+        parser.error("--watch, --production, --pack and --render are separate modes")
 
-    run(port=args.port, directory=args.dir)
+    run(port=args.port, directory=args.dir, watch=args.watch, production=args.production, pack=args.pack, render=args.render)
@@ -0,0 +1,99 @@
+from compress import remove_compressed
+from manifest import is_within
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+
+logger = logging.getLogger(__name__)
+
+asset_manifest_name = "asset-manifest.json"
+reference_pattern = re.compile(r'(\b(?:src|href)=")([^"]*)(")')
+fingerprint_pattern = re.compile(r"\.[0-9a-f]{8}\.[A-Za-z0-9]+$")
+
+class Assets:
+    # url -> fingerprinted url, e.g. /index.css -> /index.3f9a1c2b.css
+    def __init__(self, mapping) -> None:
+        self.mapping = mapping
+        self.version = hashlib.sha1(json.dumps(mapping, sort_keys=True).encode()).hexdigest()
+
+    def url(self, url):
+        return self.mapping.get(url, url)
+
+    def rewrite_html(self, html):
+        return reference_pattern.sub(lambda match: match.group(1) + self.url(match.group(2)) + match.group(3), html)
+
+    def rewrite_node(self, node):
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if item.props:
+                for attr in ("src", "href"):
+                    url = item.props.get(attr)
+                    if url in self.mapping:
+                        item.props = {**item.props, attr: self.mapping[url]}
+            stack.extend(item.children or [])
+        return node
+
+def url_for(path, dest_dir):
+    return "/" + os.path.relpath(path, dest_dir).replace(os.sep, "/")
+
+def fingerprinted_path(path, digest):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest[:8]}{ext}"
+
+def read_asset_manifest(dest_dir):
+    try:
+        with open(os.path.join(dest_dir, asset_manifest_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def fingerprint_assets(static_dir, dest_dir, manifest):
+    # names come from the content hashes already in the build manifest, so an
+    # unchanged file keeps its fingerprinted name from deploy to deploy
+    mapping = {}
+    for src, entry in sorted(manifest.files.items()):
+        dst = entry.get("output")
+        if not dst or not is_within(src, static_dir) or not os.path.exists(dst):
+            continue
+        fingerprinted = fingerprinted_path(dst, entry["hash"])
+        # the name comes from the source, a copy of a since minified output is replaced
+        if not os.path.exists(fingerprinted) or os.path.getsize(fingerprinted) != os.path.getsize(dst):
+            logger.debug(f"Fingerprinting: {dst} as {fingerprinted}")
+            if os.path.exists(fingerprinted):
+                os.remove(fingerprinted)
+            remove_compressed(fingerprinted)
+            try:
+                os.link(dst, fingerprinted)
+            except OSError:
+                shutil.copy2(dst, fingerprinted)
+        mapping[url_for(dst, dest_dir)] = url_for(fingerprinted, dest_dir)
+
+    previous = read_asset_manifest(dest_dir)
+    for url in set(previous.values()) - set(mapping.values()):
+        stale = os.path.join(dest_dir, url.lstrip("/"))
+        if os.path.exists(stale):
+            os.remove(stale)
+        remove_compressed(stale)
+    if previous != mapping:
+        remove_compressed(os.path.join(dest_dir, asset_manifest_name))
+        with open(os.path.join(dest_dir, asset_manifest_name), "w") as f:
+            json.dump(mapping, f, indent=2, sort_keys=True)
+    return Assets(mapping), previous != mapping
+
+def clear_fingerprints(dest_dir):
+    # fingerprinting turned off: drop the copies and tell the caller whether
+    # pages still point at them
+    previous = read_asset_manifest(dest_dir)
+    for url in previous.values():
+        stale = os.path.join(dest_dir, url.lstrip("/"))
+        if os.path.exists(stale):
+            os.remove(stale)
+        remove_compressed(stale)
+    if os.path.exists(os.path.join(dest_dir, asset_manifest_name)):
+        os.remove(os.path.join(dest_dir, asset_manifest_name))
+    remove_compressed(os.path.join(dest_dir, asset_manifest_name))
+    return bool(previous)
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+
+import htmlnode
+import textnode
+
+def parser_version():
+    # any edit to the parser or renderer changes this and drops every cached block
+    h = hashlib.sha256()
+    for module in (textnode, htmlnode):
+        with open(module.__file__, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+class BlockCache:
+    # rendered HTML of single blocks, keyed by a hash of the block's type and
+    # source, kept in LRU order and bounded by the total size of the HTML. The
+    # file is read on first use, so a build that renders nothing never loads it.
+    def __init__(self, path=None, max_bytes=32 << 20, collect=False) -> None:
+        self.path = path
+        # collect: keep what put adds for take, in a --jobs worker only; anywhere
+        # else the list would hold every block rendered, past max_bytes
+        self.collect = collect
+        self.max_bytes = max_bytes
+        self.version = parser_version()
+        self.blocks = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.added = []
+        self.dirty = False
+        self.loaded = not (path and os.path.exists(path))
+
+    @property
+    def entries(self):
+        if not self.loaded:
+            self.load()
+        return self.blocks
+
+    def load(self):
+        # the file holds two pickles: (version, count, size), then the entries
+        self.loaded = True
+        try:
+            with open(self.path, "rb") as f:
+                version, _, _ = pickle.load(f)
+                entries = pickle.load(f) if version == self.version else []
+        except (OSError, EOFError, TypeError, ValueError, pickle.UnpicklingError):
+            entries = []
+        # anything added before the load is newer than the file's entries
+        newer, self.blocks = self.blocks, OrderedDict(entries)
+        self.size = sum(map(len, self.blocks.values()))
+        for key, html in newer.items():
+            self.insert(key, html)
+        self.evict()
+
+    def stats(self):
+        # (entries, bytes), from the file's header while it is not loaded
+        if not self.loaded:
+            try:
+                with open(self.path, "rb") as f:
+                    version, count, size = pickle.load(f)
+                if version == self.version:
+                    return count, size
+            except (OSError, EOFError, TypeError, ValueError, pickle.UnpicklingError):
+                pass
+            return 0, 0
+        return len(self.blocks), self.size
+
+    def key(self, text, block_type, variant=""):
+        # variant separates renderings of the same source, e.g. per asset mapping
+        return hashlib.sha1(f"{block_type}\0{variant}\0{text}".encode()).digest()
+
+    def get(self, key):
+        if not self.loaded:
+            self.load()
+        html = self.blocks.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.blocks.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, key, html):
+        if not self.loaded:
+            self.load()
+        self.insert(key, html)
+        if self.collect:
+            self.added.append((key, html))
+        self.dirty = True
+
+    def insert(self, key, html):
+        old = self.blocks.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self.blocks[key] = html
+        self.size += len(html)
+        self.evict()
+
+    def evict(self):
+        while self.size > self.max_bytes:
+            _, evicted = self.blocks.popitem(last=False)
+            self.size -= len(evicted)
+
+    def take(self):
+        # what a worker process learned, to be merged into the parent's cache
+        taken = (self.added, self.hits, self.misses)
+        self.added, self.hits, self.misses = [], 0, 0
+        return taken
+
+    def merge(self, taken):
+        added, hits, misses = taken
+        for key, html in added:
+            self.put(key, html)
+        self.hits += hits
+        self.misses += misses
+
+    def save(self):
+        if not (self.path and self.dirty):
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # shards building side by side share the cache file, each writes its own tmp
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((self.version, len(self.blocks), self.size), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(list(self.blocks.items()), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self.dirty = False
@@ -0,0 +1,58 @@
+import json
+import os
+import socket
+import sys
+
+# this module only uses the standard library so that handing a build to the
+# daemon costs little more than starting the interpreter
+socket_path = os.path.join(".cache", "build.sock")
+# these need the build to run in this process
+in_process_flags = ("-h", "--help", "--watch", "--profile", "--profile-memory", "--shard", "--merge")
+
+def connect():
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        conn.close()
+        return None
+    return conn
+
+def request(conn, message):
+    # one JSON message per line each way; the daemon sends log lines while it
+    # builds and ends with a message holding the exit code
+    with conn, conn.makefile("rb") as replies:
+        conn.sendall(json.dumps(message).encode() + b"\n")
+        for line in replies:
+            yield json.loads(line)
+
+def run_in_process(argv):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main
+    main.main(argv)
+    return 0
+
+def main(argv):
+    if argv == ["--stop"]:
+        conn = connect()
+        if conn is None:
+            print("No build daemon is running", file=sys.stderr)
+            return 1
+        message = {"command": "stop"}
+    else:
+        conn = None if any(arg.split("=", 1)[0] in in_process_flags for arg in argv) else connect()
+        if conn is None:
+            return run_in_process(argv)
+        message = {"command": "build", "argv": argv, "cwd": os.getcwd()}
+
+    code = 1
+    for reply in request(conn, message):
+        if "log" in reply:
+            print(reply["log"], file=sys.stderr)
+        if "exit" in reply:
+            code = reply["exit"]
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+compressible_extensions = (".html", ".css", ".js", ".json", ".svg", ".xml", ".txt")
+min_size = 256
+# a sibling is only kept when it is at least this much smaller than the original
+min_saving = 0.1
+
+def encoders():
+    # (file suffix, compress function); mtime=0 keeps .gz output reproducible
+    found = [(".gz", lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli:
+        found.append((".br", lambda data: brotli.compress(data, quality=11)))
+    return found
+
+def compressed_siblings(path):
+    return [path + ".gz", path + ".br"]
+
+def remove_compressed(path):
+    for sibling in compressed_siblings(path):
+        if os.path.exists(sibling):
+            os.remove(sibling)
+
+def compress_file(path, incompressible=None):
+    # incompressible maps a sibling that was not worth writing to its source's
+    # mtime then, so an unchanged source is not compressed again to find out
+    if incompressible is None:
+        incompressible = {}
+    stats = {"files": 0, "bytes_in": 0, "bytes_out": 0, "skipped": 0}
+    st = os.stat(path)
+    if st.st_size < min_size:
+        remove_compressed(path)
+        stats["skipped"] += 1
+        return stats
+
+    data = None
+    for suffix, compress in encoders():
+        sibling = path + suffix
+        if incompressible.get(sibling) == st.st_mtime_ns:
+            stats["skipped"] += 1
+            continue
+        try:
+            if os.stat(sibling).st_mtime_ns == st.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = compress(data)
+        if len(compressed) > len(data) * (1 - min_saving):
+            if os.path.exists(sibling):
+                os.remove(sibling)
+            incompressible[sibling] = st.st_mtime_ns
+            stats["skipped"] += 1
+            continue
+
+        incompressible.pop(sibling, None)
+        with open(sibling, "wb") as f:
+            f.write(compressed)
+        # the sibling carries its source's mtime, so an unchanged file is skipped next time
+        os.utime(sibling, ns=(st.st_atime_ns, st.st_mtime_ns))
+        stats["files"] += 1
+        stats["bytes_in"] += len(data)
+        stats["bytes_out"] += len(compressed)
+    return stats
+
+def find_compressible(directory):
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith(compressible_extensions):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+def precompress(paths, jobs=None, incompressible=None):
+    # zlib and brotli release the GIL, so threads spread the work over cores
+    totals = {"files": 0, "bytes_in": 0, "bytes_out": 0, "skipped": 0}
+    paths = [path for path in paths if path.endswith(compressible_extensions) and os.path.exists(path)]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for stats in pool.map(lambda path: compress_file(path, incompressible), paths):
+            for key, value in stats.items():
+                totals[key] += value
+    return totals
@@ -0,0 +1,138 @@
+from main import argument_parser, build_from_args, log_level, manifest_path, block_cache_path, search_index_path
+from client import socket_path, connect
+from manifest import Manifest
+from cache import BlockCache
+from search import SearchIndex
+from watch import snapshot, changed_paths
+import contextlib
+import io
+import json
+import logging
+import os
+import socketserver
+import time
+
+logger = logging.getLogger(__name__)
+watched = ["static", "content", "template.html", "templates"]
+
+def reply(wfile, message):
+    wfile.write(json.dumps(message).encode() + b"\n")
+    wfile.flush()
+
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+class ReplyHandler(logging.Handler):
+    # forwards the build's log records to the client as they are emitted
+    def __init__(self, wfile, level) -> None:
+        super().__init__(level)
+        self.wfile = wfile
+        self.setFormatter(logging.Formatter("%(message)s"))
+
+    def emit(self, record):
+        try:
+            reply(self.wfile, {"log": self.format(record)})
+        except OSError:
+            pass
+
+class BuildDaemon:
+    # what a fresh `python3 src/main.py` loads again on every run: the imported
+    # modules and compiled templates, the manifest, the block cache, the search
+    # index, and a snapshot of the source tree that turns the next request into
+    # a build of only the paths that changed since
+    def __init__(self) -> None:
+        self.manifest = None
+        self.manifest_mtime = None
+        self.cache = None
+        self.search = None
+        self.files = None
+        self.stopped = False
+
+    def handle(self, request, wfile):
+        command = request.get("command")
+        if command == "stop":
+            self.stopped = True
+            reply(wfile, {"log": "Build daemon stopped", "exit": 0})
+        elif command != "build":
+            reply(wfile, {"log": f"Unknown command: {command}", "exit": 2})
+        elif not os.path.samefile(request["cwd"], "."):
+            reply(wfile, {"log": f"The build daemon serves {os.getcwd()}", "exit": 2})
+        else:
+            self.build(request["argv"], wfile)
+
+    def build(self, argv, wfile):
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                args = argument_parser().parse_args(argv)
+        except SystemExit as e:
+            reply(wfile, {"log": output.getvalue().rstrip(), "exit": e.code})
+            return
+
+        start = time.perf_counter()
+        # the manifest is read again if anything else built since the last request
+        if self.manifest is None or mtime(manifest_path) != self.manifest_mtime:
+            self.manifest, self.files = Manifest(manifest_path), None
+        files = snapshot(watched)
+        only = None if self.files is None or args.clean or not os.path.isdir("public") else changed_paths(self.files, files)
+        self.files = files
+        if not args.no_cache and self.cache is None:
+            self.cache = BlockCache(block_cache_path)
+        if args.search and self.search is None:
+            self.search = SearchIndex(search_index_path)
+
+        handler = ReplyHandler(wfile, log_level(args))
+        logging.getLogger().addHandler(handler)
+        try:
+            summary = build_from_args(args, None if args.no_cache else self.cache, self.search if args.search else None, self.manifest, only)
+        except Exception as e:
+            self.files = None
+            logger.error(f"Build failed: {type(e).__name__}: {e}")
+            reply(wfile, {"exit": 1})
+            return
+        finally:
+            logging.getLogger().removeHandler(handler)
+            self.manifest_mtime = mtime(manifest_path)
+
+        summary["changed"] = sorted(only) if only is not None else None
+        summary["seconds"] = time.perf_counter() - start
+        reply(wfile, {"summary": summary, "exit": 1 if summary["errors"] else 0})
+
+def serve(daemon=None):
+    daemon = daemon or BuildDaemon()
+    if os.path.exists(socket_path):
+        conn = connect()
+        if conn:
+            conn.close()
+            raise SystemExit(f"A build daemon is already running on {socket_path}")
+        os.remove(socket_path)
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                daemon.handle(json.loads(self.rfile.readline()), self.wfile)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    # one request at a time, so builds never overlap
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        logger.info(f"Build daemon for {os.getcwd()} listening on {socket_path}")
+        try:
+            while not daemon.stopped:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    # records of every level reach the per-request handlers, the daemon's own
+    # output stays at INFO
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    logging.getLogger().handlers[0].setLevel(logging.INFO)
+    serve()
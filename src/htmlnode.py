@@ -1,6 +1,10 @@
+from collections.abc import Iterator
+import io
 import re
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None) -> None:
         self.tag = tag
         self.value = value
@@ -22,6 +26,8 @@ class HTMLNode:
         return self.tag == value.tag and self.value == value.value and self.children == value.children and self.props == value.props
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None) -> None:
         super().__init__(tag, value, None, props)
     
@@ -34,13 +40,49 @@ class LeafNode(HTMLNode):
         return f"<{self.tag}" + f"{"" if not self.props else super().props_to_html()}>" + f"{self.value}" + f"</{self.tag}>"
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, children=[], props=None) -> None:
         super().__init__(tag, None, children, props)
     
     def to_html(self):
         if not self.tag or len(self.tag) == 0:
             raise ValueError("You must provide a tag for this method.")
-        if len(self.children) == 0:
+        if not isinstance(self.children, Iterator) and len(self.children) == 0:
             raise ValueError("You must provide children.")
         
-        return f"<{self.tag}{self.props_to_html()}>" + "".join(list(map(lambda child: child.to_html(), self.children))) + f"</{self.tag}>"
\ No newline at end of file
+        buffer = io.StringIO()
+        write_html(self, buffer)
+        return buffer.getvalue()
+
+def write_html(node, sink):
+    # walks the tree with an explicit stack and writes each tag and leaf to sink
+    # (anything with write(str): an open file, io.StringIO, socket.makefile("w"))
+    # as soon as it is reached, so no intermediate strings are built per level.
+    # A ParentNode's children may be an iterator, which is drawn from one child
+    # at a time so a streamed document never exists as a whole tree.
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            sink.write(item)
+        elif isinstance(item, ParentNode):
+            if not item.tag or len(item.tag) == 0:
+                raise ValueError("You must provide a tag for this method.")
+            if isinstance(item.children, Iterator):
+                sink.write(f"<{item.tag}{item.props_to_html()}>")
+                stack.append(f"</{item.tag}>")
+                stack.append(item.children)
+                continue
+            if len(item.children) == 0:
+                raise ValueError("You must provide children.")
+            sink.write(f"<{item.tag}{item.props_to_html()}>")
+            stack.append(f"</{item.tag}>")
+            stack.extend(reversed(item.children))
+        elif isinstance(item, Iterator):
+            child = next(item, None)
+            if child is not None:
+                stack.append(item)
+                stack.append(child)
+        else:
+            sink.write(item.to_html())
\ No newline at end of file
@@ -1,87 +1,556 @@
 from htmlnode import HTMLNode
-from textnode import markdown_to_blocks, markdown_to_html_node, block_to_block_type, block_type_heading
+from textnode import markdown_to_document, stream_document, scan_blocks, block_title
+from manifest import Manifest, is_within
+from template import layout_for, load_template
+from minify import minify_css_bytes
+from sync import sync_files
+from watch import watch
+from compress import precompress, find_compressible, remove_compressed
+from cache import BlockCache
+from assets import fingerprint_assets, clear_fingerprints
+from search import SearchIndex, document_terms, page_url
+from pipeline import run_pipeline
+from pack import write_pack
+from shard import parse_shard, shard_files, shard_dir, write_partial_manifest, merge_shards, is_partial_manifest
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import chain, repeat
+import profiler
+import argparse
+import io
+import logging
 import shutil
+import time
 import os
 
-def main():
-    copy_contents("static", "public")
-    generate_pages_recursive("content", "template.html", "public")
-
-def copy_contents(from_directory, to_directory):
-    # remove contents from old directory    
-    shutil.rmtree(f"{to_directory}", True)
-    os.mkdir("public")
-
-    def copy(from_directory, to_directory):
-        paths = os.listdir(from_directory)
-        for path in paths:
-            isFile = os.path.isfile(os.path.join(from_directory, path))
-            src, dst = os.path.join(from_directory, path), os.path.join(to_directory, path)
-            if isFile:
-                print(f"Copying: {src} to {dst}")
-                shutil.copy(src, dst)
-            else:
-                os.mkdir(dst)
-                copy(f"{src}", f"{dst}")
-    
-    copy(from_directory, to_directory)
-    
+manifest_path = os.path.join(".cache", "manifest.json")
+block_cache_path = os.path.join(".cache", "blocks.pickle")
+search_index_path = os.path.join(".cache", "search.pickle")
+# pages above this many bytes are streamed through stream_page
+stream_threshold = 16 << 20
+logger = logging.getLogger(__name__)
+
+def argument_parser():
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument("--incremental", action="store_true", help="only rebuild outputs whose inputs changed since the last build")
+    parser.add_argument("--clean", action="store_true", help="delete public/ before building")
+    parser.add_argument("--checksum", action="store_true", help="compare static files by content when their mtimes differ")
+    parser.add_argument("--link", action="store_true", help="hardlink static files into public/ instead of copying them")
+    parser.add_argument("--jobs", type=int, default=1, help="number of processes rendering pages, 0 for one per CPU core")
+    parser.add_argument("--pipeline", type=int, default=0, metavar="THREADS", help="with --jobs 1, read and write pages on this many threads while rendering")
+    parser.add_argument("--minify", action="store_true", help="strip whitespace from template.html's markup and from CSS files in static/")
+    parser.add_argument("--precompress", action="store_true", help="write .gz (and .br when brotli is installed) siblings for compressible outputs")
+    parser.add_argument("--fingerprint", action="store_true", help="give static files content-hashed names and point pages and the template at them")
+    parser.add_argument("--search", action="store_true", help="write a sharded search index and search.js to public/search/")
+    parser.add_argument("--no-cache", action="store_true", help="render every block instead of reusing HTML cached in .cache/blocks.pickle")
+    parser.add_argument("--pack", metavar="FILE", help="also write the built site, with any precompressed siblings, into FILE as one indexed pack for server.py --pack")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N", help="build only the I-th of N shards (1-based, split by path hash) into public.shard-I-of-N/")
+    parser.add_argument("--merge", nargs="+", metavar="SHARD_DIR", help="combine the output of every shard into public/ instead of building")
+    parser.add_argument("--watch", action="store_true", help="keep running and rebuild whatever changes in content/, static/, template.html and templates/")
+    parser.add_argument("--profile", metavar="TRACE", help="record per-page and per-phase timings and write them to TRACE as a Chrome trace")
+    parser.add_argument("--profile-memory", action="store_true", help="with --profile, also record peak memory per page (slows the build)")
+    parser.add_argument("--top", type=int, default=10, help="with --profile, how many of the slowest pages to list")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every file copied, generated or removed")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log warnings and errors")
+    return parser
+
+def log_level(args):
+    return logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+
+def build_from_args(args, cache=None, search=None, manifest=None, only=None):
+    # the build main runs for args, shared with the build daemon, which passes
+    # the state it keeps in memory
+    dest_dir, path = "public", manifest_path
+    if args.shard:
+        # a shard keeps its own manifest and leaves a partial one in its output for --merge
+        dest_dir, path = shard_dir(dest_dir, args.shard), os.path.join(".cache", f"manifest.shard-{args.shard[0]}-of-{args.shard[1]}.json")
+        manifest = Manifest(path)
+    if args.clean:
+        shutil.rmtree(dest_dir, True)
+    summary = build("static", "content", "template.html", dest_dir, path, force=not args.incremental, jobs=args.jobs or os.cpu_count(), pipeline=args.pipeline, checksum=args.checksum, link=args.link, manifest=manifest, only=only, minify=args.minify, compress=args.precompress, cache=cache, fingerprint=args.fingerprint, search=search, shard=args.shard)
+    if args.shard:
+        write_partial_manifest(dest_dir, args.shard, manifest)
+    if args.pack:
+        with profiler.span("pack"):
+            summary["pack"] = write_pack(dest_dir, args.pack)
+        logger.info(f"Packed {summary["pack"]["files"]} files into {args.pack}, {summary["pack"]["bytes"]} bytes")
+    return summary
+
+def main(argv=None):
+    parser = argument_parser()
+    args = parser.parse_args(argv)
+    if args.shard and (args.fingerprint or args.search or args.watch):
+        # all three need every page and asset in one place
+        parser.error("--shard cannot be combined with --fingerprint, --search or --watch")
+    if args.pack and args.watch:
+        parser.error("--pack is written after a build and cannot be combined with --watch")
+
+    logging.basicConfig(level=log_level(args), format="%(message)s")
+    if args.merge:
+        summary = merge_shards(args.merge, "public", args.link)
+        raise SystemExit(1 if summary["errors"] or summary["conflicts"] else 0)
+    if args.profile:
+        profiler.enable(args.profile_memory)
+
+    cache = None if args.no_cache else BlockCache(block_cache_path)
+    search = SearchIndex(search_index_path) if args.search else None
+    summary = build_from_args(args, cache, search)
+    if args.profile:
+        report_profile(profiler.active, args.profile, args.top)
+        profiler.disable()
+    if args.watch:
+        watch_and_build("static", "content", "template.html", "public", manifest_path, jobs=args.jobs or os.cpu_count(), pipeline=args.pipeline, minify=args.minify, compress=args.precompress, cache=cache, fingerprint=args.fingerprint, search=search)
+    elif summary["errors"]:
+        raise SystemExit(1)
+
+def report_profile(active, trace_path, top):
+    active.write_chrome_trace(trace_path)
+    print(f"Wrote trace with {len(active.events)} events to {trace_path}")
+    print("Time per phase (summed over pages and processes):")
+    for name, seconds in sorted(active.phase_totals().items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:<12}{seconds:>10.4f}s")
+    print(f"Slowest {top} pages:")
+    for stats in active.slowest_pages(top):
+        memory = f"{stats["peak_memory"] / 1024:>10.0f} KiB peak" if "peak_memory" in stats else ""
+        print(f"  {stats["seconds"] * 1000:>9.2f} ms {stats.get("nodes", 0):>8} nodes {stats.get("bytes_in", 0):>10} B in {stats.get("bytes_out", 0):>10} B out{memory}  {stats["src"]}")
+
+def copy_contents(from_directory, to_directory, checksum=False, link=False):
+    return sync_files(find_files(from_directory, to_directory), checksum, link)
+
 def extract_title(markdown):
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
-        if block_to_block_type(block) == block_type_heading and block.startswith("# "):
-            return block.removeprefix("# ")
+    for block in scan_blocks(markdown):
+        title = block_title(block)
+        if title is not None:
+            return title
 
     raise Exception("There must be a h1 header")
 
+def extract_front_matter(markdown):
+    # optional "key: value" lines fenced by --- at the very top of the page
+    if not markdown.startswith("---\n"):
+        return {}, markdown
+    end = markdown.find("\n---", 3)
+    if end == -1:
+        return {}, markdown
+
+    body = markdown[end + 4:]
+    return parse_front_matter(markdown[4:end].split("\n")), body.removeprefix("\n")
+
+def parse_front_matter(lines):
+    variables = {}
+    for line in lines:
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            variables[key.strip()] = value.strip()
+    return variables
+
+def read_front_matter(f):
+    # extract_front_matter for an open file: only the fenced lines are read and
+    # f is left at the start of the body, less whatever followed the closing ---
+    # on its line, which is returned along with the variables
+    if f.readline() != "---\n":
+        f.seek(0)
+        return {}, ""
+    lines = []
+    for line in iter(f.readline, ""):
+        if line.startswith("---"):
+            return parse_front_matter(lines), line[3:].removeprefix("\n")
+        lines.append(line.removesuffix("\n"))
+    f.seek(0)
+    return {}, ""
+
+
+def read_page(from_path):
+    with profiler.span("read", src=from_path):
+        with open(from_path) as f:
+            return f.read()
+
+@contextmanager
+def replacing(dest_path):
+    # the page is written beside dest_path and moved over it once complete, so
+    # a render that fails leaves the last good page (and its .gz and .br) in
+    # place; a .gz or .br of the old page would be served in place of the new
+    # one, --precompress writes fresh siblings after the pages
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp = dest_path + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            yield f
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, dest_path)
+    remove_compressed(dest_path)
+
+def write_page(dest_path, html):
+    with profiler.span("write", dst=dest_path):
+        with replacing(dest_path) as f:
+            f.write(html)
+
+def render_page(from_path, file_contents, template_path, sink, cache=None, assets=None, index=False, minify=False, stats=None):
+    with profiler.span("parse", src=from_path):
+        template = load_template(template_path, assets, minify)
+        variables, markdown = extract_front_matter(file_contents)
+        node, title = markdown_to_document(markdown, cache, assets)
+        if "Title" not in variables:
+            if title is None:
+                raise Exception("There must be a h1 header")
+            variables["Title"] = title
+        variables["Content"] = node
+
+    with profiler.span("render", src=from_path):
+        template.render_to(sink, variables)
+
+    if index:
+        start = time.perf_counter()
+        with profiler.span("index", src=from_path):
+            info = {"title": variables["Title"], "terms": document_terms(node)}
+        info["seconds"] = time.perf_counter() - start
+    else:
+        info = None
+
+    if profiler.active:
+        stats["nodes"] = profiler.count_nodes(node)
+        stats["bytes_in"], stats["bytes_out"] = len(file_contents), sink.tell()
+    return info
+
+def generate_page(from_path, template_path, dest_path, cache=None, assets=None, index=False, minify=False):
+    if os.path.getsize(from_path) > stream_threshold:
+        return stream_page(from_path, template_path, dest_path, cache, assets, index, minify)
+    logger.debug(f"Generating page from {from_path} to {dest_path} using {template_path}")
+
+    with profiler.page(from_path) as stats:
+        file_contents = read_page(from_path)
+        with replacing(dest_path) as n:
+            return render_page(from_path, file_contents, template_path, n, cache, assets, index, minify, stats)
+
+def stream_page(from_path, template_path, dest_path, cache=None, assets=None, index=False, minify=False):
+    # generate_page for markdown too large to hold in memory: the file is read
+    # line by line and each block is parsed, rendered and written out before the
+    # next one is read, so memory use does not grow with the size of the page
+    logger.debug(f"Streaming page from {from_path} to {dest_path} using {template_path}")
+
+    with profiler.page(from_path) as stats, open(from_path) as f:
+        with profiler.span("parse", src=from_path):
+            template = load_template(template_path, assets, minify)
+            variables, rest = read_front_matter(f)
+            if "Title" not in variables:
+                # a second pass over the start of the file, up to the first h1
+                offset = f.tell()
+                variables["Title"] = extract_title(chain([rest], f))
+                f.seek(offset)
+
+        node = stream_document(chain([rest], f), cache, assets)
+        terms, seconds = set(), 0
+        stats["nodes"] = 1
 
-def generate_page(from_path, template_path, dest_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+        def observed(children):
+            nonlocal seconds
+            for child in children:
+                if index:
+                    start = time.perf_counter()
+                    terms.update(document_terms(child))
+                    seconds += time.perf_counter() - start
+                if profiler.active:
+                    stats["nodes"] += profiler.count_nodes(child)
+                yield child
 
-    f = open(from_path)
-    file_contents = f.read()
-    f.close()
+        if index or profiler.active:
+            node.children = observed(node.children)
+        variables["Content"] = node
 
-    t = open(template_path)
-    template_contents = t.read()
-    t.close()
+        with profiler.span("stream", src=from_path):
+            with replacing(dest_path) as n:
+                template.render_to(n, variables)
+                bytes_out = n.tell()
 
-    node = markdown_to_html_node(file_contents)
-    html = node.to_html()
-    title = extract_title(file_contents)
-    template_contents = template_contents.replace("{{ Title }}", title)
-    template_contents = template_contents.replace("{{ Content }}", html)
+        if profiler.active:
+            stats["bytes_in"], stats["bytes_out"] = os.fstat(f.fileno()).st_size, bytes_out
+    return {"title": variables["Title"], "terms": sorted(terms), "seconds": seconds} if index else None
 
-    dir = os.path.dirname(dest_path)
-    if not os.path.exists(dir):
-        os.makedirs(dir)
-    
-    n = open(dest_path, "x")
-    n.write(template_contents)
-    n.close()
+def try_generate_page(from_path, template_path, dest_path, cache=None, assets=None, index=False, minify=False):
+    # returns (error, search info)
+    try:
+        return None, generate_page(from_path, template_path, dest_path, cache, assets, index, minify)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", None
+
+# state of a --jobs worker process, set up by init_worker
+worker_cache = None
+
+def init_worker(profile_memory, cache_path):
+    global worker_cache
+    if profile_memory is not None:
+        profiler.enable(profile_memory)
+    if cache_path:
+        worker_cache = BlockCache(cache_path, collect=True)
+
+def try_generate_page_in_worker(from_path, template_path, dest_path, assets, index, minify):
+    # profiler events, newly cached blocks and search terms travel back with the result
+    error, info = try_generate_page(from_path, template_path, dest_path, worker_cache, assets, index, minify)
+    collected = profiler.active.take() if profiler.active else None
+    taken = worker_cache.take() if worker_cache else None
+    return error, info, collected, taken
+
+def pipeline_pages(pages, templates, threads, cache=None, assets=None, index=False, minify=False):
+    # generate_page split into stages: pages are read and written on threads
+    # while the calling thread renders, each one into memory
+    def read(page):
+        # pages too large to hold in memory stream themselves in process
+        return None if os.path.getsize(page[0]) > stream_threshold else read_page(page[0])
+
+    def process(page, file_contents):
+        src, dst = page
+        if file_contents is None:
+            return generate_page(src, templates[src], dst, cache, assets, index, minify), None
+        logger.debug(f"Generating page from {src} to {dst} using {templates[src]}")
+        with profiler.page(src) as stats:
+            buffer = io.StringIO()
+            info = render_page(src, file_contents, templates[src], buffer, cache, assets, index, minify, stats)
+        return info, buffer.getvalue()
+
+    def write(page, html):
+        if html is not None:
+            write_page(page[1], html)
+
+    results = []
+    for (src, dst), info, error in run_pipeline(pages, read, process, write, threads):
+        results.append((src, dst, f"{type(error).__name__}: {error}" if error else None, info))
+    return results
+
+def generate_pages(pages, templates, jobs=1, cache=None, assets=None, index=False, pipeline=0, minify=False):
+    # templates: src -> the template file to render it with
+    # returns (src, dst, error, search info) for every page, in input order, so
+    # the outcome does not depend on how the work was spread over processes
+    if pipeline and jobs <= 1 and len(pages) > 1:
+        return pipeline_pages(pages, templates, pipeline, cache, assets, index, minify)
+    if jobs <= 1 or len(pages) <= 1:
+        return [(src, dst, *try_generate_page(src, templates[src], dst, cache, assets, index, minify)) for src, dst in pages]
+
+    srcs, dsts = [src for src, _ in pages], [dst for _, dst in pages]
+    chunksize = max(1, len(pages) // (jobs * 4))
+    # workers start from the cache as last saved and profile into their own Profiler
+    if cache:
+        cache.save()
+    initargs = (profiler.active.memory if profiler.active else None, cache.path if cache else None)
+    errors, infos = [], []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=initargs) as pool:
+        for error, info, collected, taken in pool.map(try_generate_page_in_worker, srcs, [templates[src] for src in srcs], dsts, repeat(assets), repeat(index), repeat(minify), chunksize=chunksize):
+            errors.append(error)
+            infos.append(info)
+            if collected:
+                profiler.active.merge(collected)
+            if taken:
+                cache.merge(taken)
+    return list(zip(srcs, dsts, errors, infos))
+
+def asset_output(src, from_directory, to_directory):
+    return os.path.join(to_directory, os.path.relpath(src, from_directory))
+
+def page_output(src, dir_path_content, dest_dir_path):
+    return asset_output(src, dir_path_content, dest_dir_path).removesuffix(".md") + ".html"
+
+def find_files(from_directory, to_directory):
+    files = []
+    for root, dirs, names in os.walk(from_directory):
+        dirs.sort()
+        for name in sorted(names):
+            src = os.path.join(root, name)
+            files.append((src, asset_output(src, from_directory, to_directory)))
+    return files
+
+def find_pages(dir_path_content, dest_dir_path):
+    pages = []
+    for src, _ in find_files(dir_path_content, dest_dir_path):
+        if src.endswith(".md"):
+            pages.append((src, page_output(src, dir_path_content, dest_dir_path)))
+    return pages
 
 def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    content_directory = os.listdir(dir_path_content)
-
-    def md_to_html(from_path):
-        components = from_path.split("/")
-        components[-1] = components[-1].replace(".md", ".html")
-        return "/".join(components)
-
-    def write(from_directory, to_directory):
-        paths = os.listdir(from_directory)
-        for path in paths:
-            isFile = os.path.isfile(os.path.join(from_directory, path))
-            src, dst = os.path.join(from_directory, path), md_to_html(os.path.join(to_directory, path))
-            if isFile:
-                print(f"Copying: {src} to {dst}")
-                generate_page(src, template_path, dst)
+    for src, dst in find_pages(dir_path_content, dest_dir_path):
+        generate_page(src, template_path, dst)
+
+def build(static_dir, content_dir, template_path, dest_dir, manifest_path, force=False, jobs=1, pipeline=0, checksum=False, link=False, manifest=None, only=None, minify=False, compress=False, cache=None, fingerprint=False, search=None, shard=None):
+    # shard: (index, count), only that share of the static files and pages is built
+    # only: source paths known to have changed (from a watcher); the trees are
+    # not walked and nothing outside that set is looked at
+    if manifest is None:
+        manifest = Manifest(manifest_path)
+    # section layouts, and by convention the partials, live in templates/ next to template_path
+    layouts_dir = os.path.join(os.path.dirname(template_path), "templates")
+    # only the pages rendered with a changed template file are rebuilt for it;
+    # a new section layout can change which template a page uses, so it is a walk too
+    changed_templates = set(file for file in manifest.template_files() if not os.path.exists(file) or manifest.changed(file))
+    rebuild_all = manifest.options.get("minify", False) != minify or force
+    if rebuild_all or changed_templates or (only is not None and any(is_within(path, layouts_dir) for path in only)):
+        only = None
+    with profiler.span("discover"):
+        if only is None:
+            assets = find_files(static_dir, dest_dir)
+            pages = find_pages(content_dir, dest_dir)
+        else:
+            existing = sorted(path for path in only if os.path.isfile(path))
+            assets = [(src, asset_output(src, static_dir, dest_dir)) for src in existing if is_within(src, static_dir)]
+            pages = [(src, page_output(src, content_dir, dest_dir)) for src in existing if is_within(src, content_dir) and src.endswith(".md")]
+        if shard:
+            assets, pages = shard_files(assets, static_dir, shard), shard_files(pages, content_dir, shard)
+    summary = {"copied": 0, "generated": 0, "removed": 0, "unchanged": 0, "errors": []}
+
+    try:
+        # static files are compared against their copy in dest_dir, so even a
+        # full build leaves unchanged assets alone
+        with profiler.span("sync", files=len(assets)):
+            stats = sync_files(assets, checksum, link, {".css": minify_css_bytes} if minify else None)
+            summary["copied"], summary["unchanged"] = stats["copied"], stats["skipped"]
+            if minify:
+                summary["saved"] = stats["saved"]
+            summary["bytes_copied"], summary["bytes_skipped"] = stats["bytes_copied"], stats["bytes_skipped"]
+            for src, dst in assets:
+                if manifest.changed(src):
+                    manifest.record(src, dst)
+
+        # outputs whose source went away since the last build
+        with profiler.span("prune"):
+            current = set(src for src, _ in assets) | set(src for src, _ in pages)
+            for src, dst in manifest.outputs().items():
+                if src not in current and (only is None or src in only):
+                    logger.debug(f"Removing: {dst}")
+                    if os.path.exists(dst):
+                        os.remove(dst)
+                    remove_compressed(dst)
+                    manifest.forget(src)
+                    if search:
+                        search.remove(src)
+                    summary["removed"] += 1
+            if search and only is None:
+                # pages deleted by a build without --search, which left them indexed
+                for src in set(search.docs) - set(src for src, _ in pages):
+                    search.remove(src)
+
+        fingerprints = None
+        with profiler.span("fingerprint"):
+            if fingerprint:
+                fingerprints, assets_changed = fingerprint_assets(static_dir, dest_dir, manifest)
+            else:
+                assets_changed = clear_fingerprints(dest_dir)
+        if assets_changed and not rebuild_all:
+            # every page may reference a renamed asset
+            rebuild_all = True
+            if only is not None:
+                only = None
+                assets, pages = find_files(static_dir, dest_dir), find_pages(content_dir, dest_dir)
+                if shard:
+                    assets, pages = shard_files(assets, static_dir, shard), shard_files(pages, content_dir, shard)
+
+        dirty, templates, layouts = [], {}, {}
+        for src, dst in pages:
+            directory = os.path.dirname(src)
+            if directory not in layouts:
+                layouts[directory] = layout_for(src, content_dir, template_path, layouts_dir)
+            templates[src] = layouts[directory]
+            used = manifest.dependencies.get(src)
+            stale = not used or used[0] != os.path.normpath(templates[src]) or not changed_templates.isdisjoint(used)
+            # a page missing from the search index, or indexed from an older
+            # version of its source, has to be rendered once to be indexed
+            if rebuild_all or stale or manifest.changed(src) or not os.path.exists(dst) or (search and not search.is_current(src, manifest.files[src]["hash"])):
+                dirty.append((src, dst))
             else:
-                os.mkdir(dst)
-                write(f"{src}", f"{dst}")
+                summary["unchanged"] += 1
+
+        with profiler.span("pages", pages=len(dirty), jobs=jobs):
+            results = generate_pages(dirty, templates, jobs, cache, fingerprints, index=search is not None, pipeline=pipeline, minify=minify)
+        for src, dst, error, info in results:
+            if error:
+                summary["errors"].append((src, error))
+                continue
+            manifest.record(src, dst)
+            manifest.dependencies[src] = load_template(templates[src], fingerprints, minify).dependencies
+            summary["generated"] += 1
+            if search:
+                search.update(src, page_url(dst, dest_dir), info["title"], info["terms"], manifest.files[src]["hash"])
+                search.seconds += info["seconds"]
+        # a failed page keeps the old template hashes so the next build retries
+        # every page using a changed template
+        if not summary["errors"]:
+            for file in changed_templates | (manifest.template_files() - set(manifest.files)):
+                if os.path.exists(file):
+                    manifest.record(file)
+                else:
+                    manifest.forget(file)
+            manifest.options["minify"] = minify
+        if minify and summary["generated"]:
+            # every page saves what minifying took out of its template's markup
+            generated = [templates[src] for src, _, error, _ in results if not error]
+            saved = {}
+            for path in set(generated):
+                full, minified = load_template(path, fingerprints), load_template(path, fingerprints, True)
+                saved[path] = sum(map(len, full.literals)) - sum(map(len, minified.literals))
+            summary["saved"]["html"] = sum(saved[path] for path in generated)
+
+        if search:
+            with profiler.span("search"):
+                summary["search"] = search.write(dest_dir)
+
+        if compress:
+            # every output is checked on a full walk (stat only when up to date),
+            # a watcher rebuild only compresses what it just wrote
+            with profiler.span("compress"):
+                outputs = find_compressible(dest_dir) if only is None else [dst for _, dst in assets + pages]
+                if shard:
+                    outputs = [path for path in outputs if not is_partial_manifest(os.path.relpath(path, dest_dir))]
+                if only is None:
+                    # outputs removed since then are not looked up again
+                    kept = set(outputs)
+                    manifest.incompressible = {sibling: mtime for sibling, mtime in manifest.incompressible.items() if os.path.splitext(sibling)[0] in kept}
+                summary["compression"] = precompress(outputs, jobs, manifest.incompressible)
+    finally:
+        manifest.save()
+        if cache:
+            cache.save()
+        if search:
+            search.save()
+
+    logger.info(f"Built {summary["generated"]} pages, copied {summary["copied"]} files, removed {summary["removed"]}, {summary["unchanged"]} unchanged")
+    logger.info(f"Static files: {summary["bytes_copied"]} bytes copied, {summary["bytes_skipped"]} bytes skipped")
+    if summary.get("saved"):
+        logger.info(f"Minified: {", ".join(f"{extension} {saved} bytes saved" for extension, saved in sorted(summary["saved"].items()))}")
+    if "compression" in summary:
+        stats = summary["compression"]
+        logger.info(f"Precompressed {stats["files"]} files: {stats["bytes_in"]} bytes to {stats["bytes_out"]} bytes, {stats["skipped"]} not worth compressing")
+    if "search" in summary:
+        stats = summary["search"]
+        logger.info(f"Search index: {stats["docs"]} pages, {stats["terms"]} terms, {stats["shards_written"]} shards written, {stats["bytes"]} bytes, {search.seconds:.3f}s indexing")
+        stats["seconds"], search.seconds = search.seconds, 0
+    if cache:
+        entries, size = cache.stats()
+        summary["cache"] = {"hits": cache.hits, "misses": cache.misses, "entries": entries, "bytes": size}
+        logger.info(f"Block cache: {cache.hits} hits, {cache.misses} misses, {entries} entries, {size} bytes")
+        cache.hits = cache.misses = 0
+    for src, error in summary["errors"]:
+        logger.error(f"Failed: {src}: {error}")
+    return summary
+
+def watch_and_build(static_dir, content_dir, template_path, dest_dir, manifest_path, jobs=1, pipeline=0, minify=False, compress=False, cache=None, fingerprint=False, search=None, on_rebuild=None, stop=None):
+    # the manifest stays in memory between rebuilds and is written after each one
+    manifest = Manifest(manifest_path)
+
+    def rebuild(changed):
+        logger.info(f"Changed: {", ".join(sorted(changed))}")
+        try:
+            summary = build(static_dir, content_dir, template_path, dest_dir, manifest_path, jobs=jobs, pipeline=pipeline, manifest=manifest, only=changed, minify=minify, compress=compress, cache=cache, fingerprint=fingerprint, search=search)
+        except Exception as e:
+            logger.error(f"Rebuild failed: {type(e).__name__}: {e}")
+            return
+        if on_rebuild:
+            on_rebuild(summary)
 
-    write(dir_path_content, dest_dir_path)
+    layouts_dir = os.path.join(os.path.dirname(template_path), "templates")
+    logger.info(f"Watching {static_dir}, {content_dir}, {template_path} and {layouts_dir} for changes")
+    try:
+        watch([static_dir, content_dir, template_path, layouts_dir], rebuild, stop=stop)
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
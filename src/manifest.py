@@ -0,0 +1,94 @@
+import argparse
+import hashlib
+import json
+import os
+
+manifest_version = 1
+
+def is_within(path, directory):
+    return os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class Manifest:
+    def __init__(self, path) -> None:
+        self.path = path
+        self.files = {}
+        # build settings that change every output, such as minification
+        self.options = {}
+        # page -> the template files it was rendered with, its own template first
+        self.dependencies = {}
+        # compressed siblings not worth writing -> the mtime of their output then
+        self.incompressible = {}
+        self.pending = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == manifest_version:
+                self.files = data["files"]
+                self.options = data.get("options", {})
+                self.dependencies = data.get("dependencies", {})
+                self.incompressible = data.get("incompressible", {})
+
+    def changed(self, path):
+        # size and mtime are compared first so an untouched file is never read
+        st = os.stat(path)
+        entry = self.files.get(path)
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+            return False
+
+        digest = file_hash(path)
+        self.pending[path] = (st, digest)
+        if entry and entry["hash"] == digest:
+            entry["size"], entry["mtime"] = st.st_size, st.st_mtime_ns
+            return False
+        return True
+
+    def record(self, path, output=None):
+        st, digest = self.pending.pop(path, (None, None))
+        if st is None:
+            st, digest = os.stat(path), file_hash(path)
+        self.files[path] = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": digest, "output": output}
+
+    def forget(self, path):
+        self.files.pop(path, None)
+        self.dependencies.pop(path, None)
+
+    def template_files(self):
+        return set(file for files in self.dependencies.values() for file in files)
+
+    def dependents(self, files):
+        # the pages rendered with any of files, as of the last build
+        files = set(files)
+        return sorted(page for page, used in self.dependencies.items() if files.intersection(used))
+
+    def outputs(self):
+        return {path: entry["output"] for path, entry in self.files.items() if entry.get("output")}
+
+    def save(self):
+        dir = os.path.dirname(self.path)
+        if dir and not os.path.exists(dir):
+            os.makedirs(dir)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": manifest_version, "files": self.files, "options": self.options, "dependencies": self.dependencies, "incompressible": self.incompressible}, f, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show which pages the last build rendered with which template files")
+    parser.add_argument("files", nargs="*", help="template files to list the dependent pages of; all pages and their templates if none")
+    parser.add_argument("--manifest", default=os.path.join(".cache", "manifest.json"))
+    args = parser.parse_args()
+    manifest = Manifest(args.manifest)
+    if args.files:
+        for page in manifest.dependents(os.path.normpath(file) for file in args.files):
+            print(page)
+    else:
+        for page, files in sorted(manifest.dependencies.items()):
+            print(f"{page}: {" ".join(files)}")
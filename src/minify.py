@@ -0,0 +1,67 @@
+import re
+
+# whitespace next to these tags is never rendered, so it is dropped; anywhere
+# else a run of whitespace still separates words and becomes one space
+block_tags = set("!doctype html head body title meta link base article section nav aside header footer main div p h1 h2 h3 h4 h5 h6 ul ol li dl dt dd table thead tbody tfoot tr th td caption blockquote pre form fieldset figure figcaption hr address details summary noscript".split())
+html_token_pattern = re.compile(r"<(pre|textarea|script|style)\b.*?</\1\s*>|<!--(?!\[).*?-->|<[^>]*>", re.DOTALL | re.IGNORECASE)
+tag_name_pattern = re.compile(r"</?([!\w]+)")
+whitespace_pattern = re.compile(r"\s+")
+
+def is_block_tag(token):
+    match = tag_name_pattern.match(token)
+    return bool(match) and match.group(1).lower() in block_tags
+
+def minify_html(html):
+    # for template sources, so it runs once per template rather than per page.
+    # pre, textarea, script and style are kept as they are, except that the
+    # CSS in style is minified; comments are dropped but conditional ones kept
+    out, pos, previous_block = [], 0, True
+    for match in html_token_pattern.finditer(html):
+        token = match.group(0)
+        block = is_block_tag(token)
+        out.append(collapse(html[pos:match.start()], previous_block, block))
+        if token.startswith("<!--") and not token.startswith("<!--["):
+            # a dropped comment is transparent to the whitespace around it
+            pos = match.end()
+            continue
+        if (match.group(1) or "").lower() == "style":
+            open_end = token.index(">") + 1
+            close_start = token.rindex("</")
+            token = token[:open_end] + minify_css(token[open_end:close_start]) + token[close_start:]
+        out.append(token)
+        pos, previous_block = match.end(), block
+    out.append(collapse(html[pos:], previous_block, True))
+    return "".join(out)
+
+def collapse(text, after_block, before_block):
+    text = whitespace_pattern.sub(" ", text)
+    if after_block:
+        text = text.lstrip(" ")
+    if before_block:
+        text = text.rstrip(" ")
+    return text
+
+css_token_pattern = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|/\*.*?\*/", re.DOTALL)
+css_punctuation_pattern = re.compile(r"\s*([{};,>])\s*")
+
+def minify_css(css):
+    # comments go, strings are left alone, and whitespace is only removed where
+    # it cannot be significant: around { } ; , > and after a colon. A space
+    # before a colon is kept ("a :hover" is not "a:hover"), as are the spaces
+    # calc() needs around + and -
+    out, pos = [], 0
+    for match in css_token_pattern.finditer(css):
+        out.append(compact_css(css[pos:match.start()]))
+        if not match.group(0).startswith("/*"):
+            out.append(match.group(0))
+        pos = match.end()
+    out.append(compact_css(css[pos:]))
+    return "".join(out).strip().replace(";}", "}")
+
+def compact_css(css):
+    css = whitespace_pattern.sub(" ", css)
+    css = css_punctuation_pattern.sub(r"\1", css)
+    return css.replace(": ", ":")
+
+def minify_css_bytes(data):
+    return minify_css(data.decode("utf-8")).encode("utf-8")
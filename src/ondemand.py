@@ -0,0 +1,108 @@
+from main import render_page
+from manifest import is_within
+from template import layout_for, load_template
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+import hashlib
+import io
+import logging
+import os
+import posixpath
+import threading
+
+logger = logging.getLogger(__name__)
+
+# stat: (mtime, size) of the source when it was last checked, template: the
+# compiled template it was rendered with
+RenderedPage = namedtuple("RenderedPage", ["stat", "template", "hash", "body", "etag"])
+
+class OnDemandSite:
+    # renders pages of content_dir when they are first requested instead of
+    # building the whole site: nothing is walked up front, so the first page
+    # is as fast on a site of ten thousand drafts as on one of ten. Rendered
+    # pages are kept in an LRU bounded by bytes; an entry stays valid while
+    # its template (and every file included in or extended by it) is unchanged
+    # and the source has the same mtime and size, or failing that the same
+    # hash. Concurrent requests for a page that is
+    # being rendered wait for that render rather than starting their own.
+    def __init__(self, content_dir="content", template_path="template.html", max_bytes=64 << 20) -> None:
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.layouts_dir = os.path.join(os.path.dirname(template_path), "templates")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.rendering = {}
+        self.lock = threading.Lock()
+        self.renders = 0
+
+    def source_for(self, url_path):
+        # /, /blog/ and /blog/post.html come from index.md, blog/index.md and
+        # blog/post.md; anything else is not a page
+        path = posixpath.normpath(url_path)
+        if url_path.endswith("/"):
+            rel = posixpath.join(path, "index.md")
+        elif path.endswith(".html"):
+            rel = path.removesuffix(".html") + ".md"
+        else:
+            return None
+        src = os.path.join(self.content_dir, *rel.strip("/").split("/"))
+        return src if is_within(src, self.content_dir) and os.path.isfile(src) else None
+
+    def is_section(self, url_path):
+        # /blog without its slash, to be redirected
+        return not url_path.endswith("/") and self.source_for(url_path + "/") is not None
+
+    def page(self, src):
+        st = os.stat(src)
+        # load_template hands back the same object until one of its files changes
+        template = load_template(layout_for(src, self.content_dir, self.template_path, self.layouts_dir))
+        with self.lock:
+            entry = self.entries.get(src)
+            if entry and entry.stat == (st.st_mtime_ns, st.st_size) and entry.template is template:
+                self.entries.move_to_end(src)
+                return entry
+            future = self.rendering.get(src)
+            owner = future is None
+            if owner:
+                future = self.rendering[src] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            entry = self.render(src, st, template, entry)
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.rendering[src]
+
+    def render(self, src, st, template, old):
+        with open(src, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if old and old.hash == digest and old.template is template:
+            # touched but not changed
+            entry = old._replace(stat=(st.st_mtime_ns, st.st_size))
+        else:
+            logger.info(f"Rendering {src}")
+            buffer = io.StringIO()
+            render_page(src, data.decode(), template.name, buffer)
+            body = buffer.getvalue().encode()
+            etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+            entry = RenderedPage((st.st_mtime_ns, st.st_size), template, digest, body, etag)
+            self.renders += 1
+
+        with self.lock:
+            replaced = self.entries.pop(src, None)
+            if replaced:
+                self.size -= len(replaced.body)
+            self.entries[src] = entry
+            self.size += len(entry.body)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+        return entry
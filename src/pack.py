@@ -0,0 +1,130 @@
+from collections import namedtuple
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+
+# A pack holds a whole built site in one file:
+#   header   magic, number of entries, size of the path table
+#   entries  one per URL path, sorted by path so a lookup is a binary search
+#   paths    the URL paths, utf-8, concatenated
+#   bodies   every file's bytes, and the bytes of its .gz/.br siblings
+pack_magic = b"SSGPACK1"
+header_struct = struct.Struct("<8sII")
+# path offset and length in the path table, mtime, digest for the ETag, then
+# (offset, length) of the body in each encoding, offset 0 when there is none
+entry_struct = struct.Struct("<IIQ8sQQQQQQ")
+encodings = [("identity", ""), ("gzip", ".gz"), ("br", ".br")]
+
+PackEntry = namedtuple("PackEntry", ["path", "mtime", "etag", "bodies"])
+
+def pack_files(directory):
+    # URL path -> file for everything under directory; .gz and .br siblings
+    # are stored as encodings of their file rather than as files of their own
+    files = {}
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in names:
+            path = os.path.join(root, name)
+            base, suffix = os.path.splitext(path)
+            if suffix in (".gz", ".br") and os.path.isfile(base):
+                continue
+            files["/" + os.path.relpath(path, directory).replace(os.sep, "/")] = path
+    return files
+
+def copy_body(src, out, digest=None):
+    with open(src, "rb") as f:
+        while chunk := f.read(1 << 20):
+            if digest:
+                digest.update(chunk)
+            out.write(chunk)
+
+def write_pack(directory, pack_path):
+    files = pack_files(directory)
+    paths = sorted(files, key=lambda path: path.encode())
+    table = b"".join(path.encode() for path in paths)
+    entries_offset = header_struct.size
+    bodies_offset = entries_offset + len(paths) * entry_struct.size + len(table)
+
+    tmp = pack_path + ".tmp"
+    entries, path_offset, total = [], 0, 0
+    with open(tmp, "wb") as out:
+        out.seek(bodies_offset)
+        for path in paths:
+            src = files[path]
+            bodies, digest = [], hashlib.sha1()
+            for _, suffix in encodings:
+                if suffix and not os.path.isfile(src + suffix):
+                    bodies.extend((0, 0))
+                    continue
+                start = out.tell()
+                copy_body(src + suffix, out, None if suffix else digest)
+                bodies.extend((start, out.tell() - start))
+            encoded = path.encode()
+            entries.append(entry_struct.pack(path_offset, len(encoded), os.stat(src).st_mtime_ns, digest.digest()[:8], *bodies))
+            path_offset += len(encoded)
+        total = out.tell()
+        out.seek(0)
+        out.write(header_struct.pack(pack_magic, len(paths), len(table)))
+        out.write(b"".join(entries))
+        out.write(table)
+    os.replace(tmp, pack_path)
+    return {"files": len(paths), "bytes": total}
+
+class Pack:
+    # read side, over an mmap of the pack: a lookup touches only the entries
+    # it bisects, and bodies are memoryview slices of the map, never copies
+    def __init__(self, path) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.data)
+        magic, self.count, table_size = header_struct.unpack_from(self.data, 0)
+        if magic != pack_magic:
+            raise ValueError(f"{path} is not a site pack")
+        self.entries_offset = header_struct.size
+        self.table_offset = self.entries_offset + self.count * entry_struct.size
+
+    def path_at(self, index):
+        offset, length = struct.unpack_from("<II", self.data, self.entries_offset + index * entry_struct.size)
+        return self.data[self.table_offset + offset:self.table_offset + offset + length]
+
+    def find(self, path):
+        key = path.encode()
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.path_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count or self.path_at(low) != key:
+            return None
+        _, _, mtime, digest, *offsets = entry_struct.unpack_from(self.data, self.entries_offset + low * entry_struct.size)
+        bodies = {}
+        for (encoding, _), offset, length in zip(encodings, offsets[::2], offsets[1::2]):
+            if offset:
+                bodies[encoding] = (offset, length)
+        return PackEntry(path, mtime, digest.hex(), bodies)
+
+    def body(self, entry, encoding="identity"):
+        offset, length = entry.bodies[encoding]
+        return self.view[offset:offset + length]
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.path_at(index).decode()
+
+    def close(self):
+        self.view.release()
+        self.data.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a built site into one indexed file for server.py --pack")
+    parser.add_argument("directory")
+    parser.add_argument("pack")
+    args = parser.parse_args()
+    stats = write_pack(args.directory, args.pack)
+    print(f"Packed {stats["files"]} files into {args.pack}, {stats["bytes"]} bytes")
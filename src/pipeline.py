@@ -0,0 +1,42 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+def run_pipeline(items, read, process, write, threads=4, depth=16):
+    # runs every item through read -> process -> write. read and write are I/O
+    # and run on a pool of threads; process runs on the calling thread and
+    # returns (result, output) where output is handed to write. The queues
+    # between the stages are bounded by depth: reading stops that far ahead of
+    # process, and process waits once that many writes are outstanding.
+    # Yields (item, result, error) in input order, error being the first
+    # exception any stage raised for that item.
+    items = iter(items)
+    reads, writes = deque(), deque()
+
+    def fill(pool):
+        while len(reads) < depth:
+            item = next(items, reads)
+            if item is reads:
+                return
+            reads.append((item, pool.submit(read, item)))
+
+    def finish(item, result, writing):
+        if isinstance(writing, Exception):
+            return item, None, writing
+        try:
+            writing.result()
+        except Exception as e:
+            return item, result, e
+        return item, result, None
+
+    with ThreadPoolExecutor(threads) as pool:
+        fill(pool)
+        while reads:
+            item, reading = reads.popleft()
+            fill(pool)
+            try:
+                result, output = process(item, reading.result())
+                writes.append((item, result, pool.submit(write, item, output)))
+            except Exception as e:
+                writes.append((item, None, e))
+            while writes and (len(writes) >= depth or not reads):
+                yield finish(*writes.popleft())
@@ -0,0 +1,88 @@
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# the profiler in use, None when profiling is off; every hook below checks it
+# first so an unprofiled build only pays for that check
+active = None
+
+class Profiler:
+    def __init__(self, memory=False) -> None:
+        self.memory = memory
+        self.events = []
+        self.pages = []
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name, args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.events.append({"name": name, "ph": "X", "ts": start / 1000, "dur": (end - start) / 1000, "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+
+    @contextmanager
+    def page(self, src):
+        stats = {"src": src}
+        if self.memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        with self.span("page", {"src": src}):
+            yield stats
+        stats["seconds"] = time.perf_counter() - start
+        if self.memory:
+            stats["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        self.pages.append(stats)
+
+    def take(self):
+        # events and page stats recorded in a worker process, to be merged by the parent
+        collected = (self.events, self.pages)
+        self.events, self.pages = [], []
+        return collected
+
+    def merge(self, collected):
+        events, pages = collected
+        self.events.extend(events)
+        self.pages.extend(pages)
+
+    def write_chrome_trace(self, path):
+        # loadable in chrome://tracing and Perfetto
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def phase_totals(self):
+        totals = {}
+        for event in self.events:
+            totals[event["name"]] = totals.get(event["name"], 0) + event["dur"] / 1e6
+        return totals
+
+    def slowest_pages(self, count):
+        return sorted(self.pages, key=lambda stats: stats["seconds"], reverse=True)[:count]
+
+def enable(memory=False):
+    global active
+    active = Profiler(memory)
+    return active
+
+def disable():
+    global active
+    active = None
+
+def span(name, **args):
+    return active.span(name, args) if active else nullcontext()
+
+def page(src):
+    return active.page(src) if active else nullcontext({})
+
+def count_nodes(node):
+    count, stack = 0, [node]
+    while stack:
+        item = stack.pop()
+        count += 1
+        stack.extend(item.children or [])
+    return count
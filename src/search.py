@@ -0,0 +1,200 @@
+from assets import url_for
+from compress import remove_compressed
+import json
+import os
+import pickle
+import re
+import time
+
+search_dir_name = "search"
+# terms are sharded by their first characters; a query only fetches the
+# shards for its own terms
+prefix_length = 2
+word_pattern = re.compile(r"\w+")
+raw_tag_pattern = re.compile(r"<[^>]*>")
+raw_alt_pattern = re.compile(r'<img\b[^>]*?\balt="([^"]*)"')
+stopwords = set("a an and are as at be but by for from has have he her his i if in into is it its of on or our she so than that the their them then there these they this to was we were what when which who will with you your".split())
+
+def document_text(node):
+    # text of every leaf; cached blocks are raw HTML leaves, so tags are
+    # stripped, keeping the alt text of their images as for a parsed img
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if item.children:
+            stack.extend(item.children)
+        elif item.tag == "img":
+            yield (item.props or {}).get("alt", "")
+        elif item.value and item.tag is None:
+            yield from raw_alt_pattern.findall(item.value)
+            yield raw_tag_pattern.sub(" ", item.value)
+        elif item.value:
+            yield item.value
+
+def document_terms(node):
+    terms = set()
+    for text in document_text(node):
+        for word in word_pattern.findall(text.lower()):
+            if len(word) >= 2 and word not in stopwords:
+                terms.add(word)
+    return sorted(terms)
+
+def page_url(dest_path, dest_dir):
+    url = url_for(dest_path, dest_dir)
+    return url.removesuffix("index.html") if url.endswith("/index.html") else url
+
+def delta_encode(ids):
+    previous, deltas = 0, []
+    for id in sorted(ids):
+        deltas.append(id - previous)
+        previous = id
+    return deltas
+
+class SearchIndex:
+    # inverted index kept between builds, so a build only touches the shards
+    # whose terms gained or lost a page; document ids are stable for the same reason
+    def __init__(self, path=None) -> None:
+        self.path = path
+        self.docs = {}
+        self.postings = {}
+        self.free_ids = []
+        self.next_id = 0
+        self.dirty_shards = set()
+        self.docs_changed = False
+        self.seconds = 0
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.docs, self.postings, self.free_ids, self.next_id = pickle.load(f)
+
+    def shard(self, term):
+        return term[:prefix_length]
+
+    def update(self, src, url, title, terms, hash=None):
+        # hash: of the source the terms came from, see is_current
+        start = time.perf_counter()
+        old = self.docs.get(src)
+        if old:
+            id = old["id"]
+            removed, added = set(old["terms"]) - set(terms), set(terms) - set(old["terms"])
+        else:
+            id = self.free_ids.pop() if self.free_ids else self.next_id
+            self.next_id = max(self.next_id, id + 1)
+            removed, added = set(), set(terms)
+        for term in removed:
+            self.unpost(term, id)
+        for term in added:
+            self.postings.setdefault(term, set()).add(id)
+            self.dirty_shards.add(self.shard(term))
+        if not old or old["url"] != url or old["title"] != title:
+            self.docs_changed = True
+        self.docs[src] = {"id": id, "url": url, "title": title, "terms": terms, "hash": hash}
+        self.seconds += time.perf_counter() - start
+
+    def is_current(self, src, hash):
+        # false for a page rebuilt by a build without --search since it was indexed
+        doc = self.docs.get(src)
+        return doc is not None and doc.get("hash") == hash
+
+    def remove(self, src):
+        old = self.docs.pop(src, None)
+        if not old:
+            return
+        for term in old["terms"]:
+            self.unpost(term, old["id"])
+        self.free_ids.append(old["id"])
+        self.docs_changed = True
+
+    def unpost(self, term, id):
+        ids = self.postings.get(term)
+        if ids is None:
+            return
+        ids.discard(id)
+        if not ids:
+            del self.postings[term]
+        self.dirty_shards.add(self.shard(term))
+
+    def write(self, dest_dir):
+        start = time.perf_counter()
+        directory = os.path.join(dest_dir, search_dir_name)
+        docs_path = os.path.join(directory, "docs.json")
+        if not os.path.exists(docs_path):
+            # a clean output tree: every shard has to be written again
+            self.dirty_shards = set(self.shard(term) for term in self.postings)
+            self.docs_changed = True
+        os.makedirs(directory, exist_ok=True)
+
+        if self.docs_changed:
+            docs = [None] * self.next_id
+            for doc in self.docs.values():
+                docs[doc["id"]] = [doc["url"], doc["title"]]
+            remove_compressed(docs_path)
+            with open(docs_path, "w") as f:
+                json.dump(docs, f, separators=(",", ":"))
+        client_path = os.path.join(directory, "search.js")
+        try:
+            with open(client_path) as f:
+                client_current = f.read() == search_client
+        except FileNotFoundError:
+            client_current = False
+        if not client_current:
+            remove_compressed(client_path)
+            with open(client_path, "w") as f:
+                f.write(search_client)
+
+        by_shard = {}
+        for term, ids in self.postings.items():
+            prefix = self.shard(term)
+            if prefix in self.dirty_shards:
+                by_shard.setdefault(prefix, {})[term] = delta_encode(ids)
+        written = 0
+        for prefix in self.dirty_shards:
+            path = os.path.join(directory, f"{prefix}.json")
+            remove_compressed(path)
+            if prefix not in by_shard:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            with open(path, "w") as f:
+                json.dump(by_shard[prefix], f, separators=(",", ":"), sort_keys=True)
+            written += 1
+
+        self.dirty_shards, self.docs_changed = set(), False
+        self.seconds += time.perf_counter() - start
+        size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        return {"docs": len(self.docs), "terms": len(self.postings), "shards_written": written, "bytes": size}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((self.docs, self.postings, self.free_ids, self.next_id), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+search_client = """// search("hobbit ring") resolves to [{url, title}] of pages containing every term.
+// Only docs.json and the shards for the query's term prefixes are fetched.
+const searchRoot = new URL(".", document.currentScript.src).pathname;
+const searchCache = {};
+
+function fetchSearchJSON(name) {
+    if (!searchCache[name]) {
+        searchCache[name] = fetch(searchRoot + name + ".json").then(r => r.ok ? r.json() : {});
+    }
+    return searchCache[name];
+}
+
+async function search(query) {
+    const terms = (query.toLowerCase().match(/[\\p{L}\\p{N}_]+/gu) || []).filter(t => t.length >= %d);
+    if (terms.length === 0) return [];
+    const docs = await fetchSearchJSON("docs");
+    let result = null;
+    for (const term of terms) {
+        const shard = await fetchSearchJSON(term.slice(0, %d));
+        let id = 0;
+        const ids = new Set((shard[term] || []).map(delta => id += delta));
+        result = result === null ? ids : new Set([...result].filter(x => ids.has(x)));
+    }
+    return [...result].map(id => ({url: docs[id][0], title: docs[id][1]}));
+}
+""" % (prefix_length, prefix_length)
@@ -0,0 +1,153 @@
+from compress import compressed_siblings, remove_compressed
+from manifest import file_hash
+from sync import sync_files
+import argparse
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+
+partial_manifest_name = "shard-manifest.json"
+partial_manifest_version = 1
+logger = logging.getLogger(__name__)
+
+def parse_shard(text):
+    index, sep, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = 0
+    if not sep or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"expected I/N with 1 <= I <= N, got {text!r}")
+    return index, count
+
+def shard_of(path, root, count):
+    # 1-based; hashed from the path relative to its tree with / separators so
+    # every node agrees wherever the checkout lives
+    rel = os.path.relpath(path, root).replace(os.sep, "/")
+    return int.from_bytes(hashlib.sha1(rel.encode()).digest()[:8], "big") % count + 1
+
+def shard_files(files, root, shard):
+    index, count = shard
+    return [(src, dst) for src, dst in files if shard_of(src, root, count) == index]
+
+def shard_dir(dest_dir, shard):
+    return f"{dest_dir}.shard-{shard[0]}-of-{shard[1]}"
+
+def is_partial_manifest(rel):
+    # the manifest and any compressed copy of it, which is never an output
+    return rel in [partial_manifest_name, *compressed_siblings(partial_manifest_name)]
+
+def read_partial_manifest(directory):
+    try:
+        with open(os.path.join(directory, partial_manifest_name)) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return data if data.get("version") == partial_manifest_version else None
+
+def write_partial_manifest(dest_dir, shard, manifest):
+    # every file in the shard's output tree with its hash and, for outputs the
+    # build recorded, its source; unchanged files keep their previous hash
+    old = (read_partial_manifest(dest_dir) or {}).get("files", {})
+    sources = {os.path.relpath(output, dest_dir).replace(os.sep, "/"): src for src, output in manifest.outputs().items()}
+    files = {}
+    for root, dirs, names in os.walk(dest_dir):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, dest_dir).replace(os.sep, "/")
+            if is_partial_manifest(rel):
+                continue
+            st = os.stat(path)
+            entry = old.get(rel)
+            digest = entry["hash"] if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns else file_hash(path)
+            files[rel] = {"hash": digest, "size": st.st_size, "mtime": st.st_mtime_ns, "source": sources.get(rel)}
+
+    path = os.path.join(dest_dir, partial_manifest_name)
+    remove_compressed(path)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"version": partial_manifest_version, "shard": shard[0], "count": shard[1], "files": files}, f, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def merge_shards(shard_dirs, dest_dir, link=False):
+    # checks the partial manifests first and only writes dest_dir when every
+    # shard is present and no two shards disagree about an output
+    summary = {"files": 0, "copied": 0, "removed": 0, "conflicts": [], "errors": []}
+    partials = []
+    for directory in shard_dirs:
+        partial = read_partial_manifest(directory)
+        if partial is None:
+            summary["errors"].append(f"{directory}: no {partial_manifest_name}")
+        else:
+            partials.append((directory, partial))
+
+    counts = set(partial["count"] for _, partial in partials)
+    indexes = [partial["shard"] for _, partial in partials]
+    if len(counts) > 1:
+        summary["errors"].append(f"shards from builds split {sorted(counts)} ways")
+    elif counts:
+        missing = sorted(set(range(1, counts.pop() + 1)) - set(indexes))
+        if missing:
+            summary["errors"].append(f"missing shards: {", ".join(map(str, missing))}")
+    for index in sorted(set(index for index in indexes if indexes.count(index) > 1)):
+        summary["errors"].append(f"shard {index} given more than once")
+
+    claims = {}
+    for directory, partial in partials:
+        for rel, entry in partial["files"].items():
+            if is_partial_manifest(rel):
+                continue
+            path = os.path.join(directory, rel)
+            if not os.path.isfile(path) or os.path.getsize(path) != entry["size"]:
+                summary["errors"].append(f"{path}: does not match its shard manifest")
+                continue
+            claimed = claims.get(rel)
+            if claimed is None:
+                claims[rel] = (directory, entry)
+            elif claimed[1]["hash"] != entry["hash"]:
+                # the same output with the same content from two shards is harmless
+                summary["conflicts"].append((rel, claimed[0], directory))
+
+    for error in summary["errors"]:
+        logger.error(f"Merge failed: {error}")
+    for rel, first, second in summary["conflicts"]:
+        logger.error(f"Conflict: {rel} differs between {first} and {second}")
+    if summary["errors"] or summary["conflicts"]:
+        return summary
+
+    outputs = set(os.path.join(dest_dir, rel) for rel in claims)
+    stats = sync_files([(os.path.join(directory, rel), os.path.join(dest_dir, rel)) for rel, (directory, _) in sorted(claims.items())], link=link)
+    for root, _, names in os.walk(dest_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            if path not in outputs:
+                logger.debug(f"Removing: {path}")
+                os.remove(path)
+                summary["removed"] += 1
+    summary["files"], summary["copied"] = len(claims), stats["copied"]
+    logger.info(f"Merged {len(partials)} shards into {dest_dir}: {summary["files"]} files, {summary["copied"]} copied, {summary["removed"]} removed")
+    return summary
+
+def run_local(count, argv, dest_dir="public"):
+    # N processes standing in for N build nodes, then the merge
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    shards = [(index, count) for index in range(1, count + 1)]
+    workers = [subprocess.Popen([sys.executable, main_path, "--shard", f"{index}/{count}", *argv]) for index, count in shards]
+    failed = [f"{index}/{count}" for (index, count), worker in zip(shards, workers) if worker.wait() != 0]
+    if failed:
+        logger.error(f"Shards failed: {", ".join(failed)}")
+        return 1
+    summary = merge_shards([shard_dir(dest_dir, shard) for shard in shards], dest_dir, "--link" in argv)
+    return 1 if summary["errors"] or summary["conflicts"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the site as N shards in N local processes and merge them into public/")
+    parser.add_argument("count", type=int)
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="passed to every src/main.py --shard run")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(run_local(args.count, args.args))
@@ -0,0 +1,110 @@
+from compress import remove_compressed
+from manifest import file_hash
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+def needs_copy(src, dst, checksum=False):
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return True
+    src_stat = os.stat(src)
+    if src_stat.st_size != dst_stat.st_size:
+        return True
+    if src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+        return False
+    if checksum and file_hash(src) == file_hash(dst):
+        # same bytes, only the timestamp drifted (fresh checkout, touch)
+        shutil.copystat(src, dst)
+        return False
+    return True
+
+def needs_transform(src, dst, transform):
+    # returns the transformed bytes when dst has to be written again. A
+    # transformed dst is newer than its source, while a plain copy from a build
+    # without the transform has the source's mtime and is replaced, unless the
+    # transform had nothing to remove
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        dst_stat = None
+    src_stat = os.stat(src)
+    if dst_stat and dst_stat.st_mtime_ns > src_stat.st_mtime_ns:
+        return None
+    with open(src, "rb") as f:
+        data = transform(f.read())
+    if dst_stat and src_stat.st_mtime_ns == dst_stat.st_mtime_ns and len(data) == src_stat.st_size:
+        return None
+    return data
+
+def copy_data(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+            return
+        except (AttributeError, OSError):
+            pass
+    # no copy_file_range here (other platform, cross-device, unsupported fs);
+    # shutil.copyfile still uses sendfile where it can
+    shutil.copyfile(src, dst)
+
+def copy_file(src, dst, link=False):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    # never write through an existing file, it may be a hardlink to a source
+    if os.path.lexists(dst):
+        os.remove(dst)
+    remove_compressed(dst)
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    copy_data(src, dst)
+    shutil.copystat(src, dst)
+
+def write_transformed(src, dst, data):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.lexists(dst):
+        os.remove(dst)
+    remove_compressed(dst)
+    with open(dst, "wb") as f:
+        f.write(data)
+    shutil.copymode(src, dst)
+
+def sync_files(files, checksum=False, link=False, transforms=None):
+    # transforms: {extension: function from the source bytes to the bytes to
+    # write}; those files are written rather than copied or linked
+    stats = {"copied": 0, "skipped": 0, "bytes_copied": 0, "bytes_skipped": 0, "saved": {}}
+    for src, dst in files:
+        size = os.stat(src).st_size
+        transform = transforms.get(os.path.splitext(src)[1]) if transforms else None
+        if transform:
+            data = needs_transform(src, dst, transform)
+            if data is None:
+                stats["skipped"] += 1
+                stats["bytes_skipped"] += size
+                continue
+            logger.debug(f"Transforming: {src} to {dst}")
+            write_transformed(src, dst, data)
+            stats["copied"] += 1
+            stats["bytes_copied"] += size
+            extension = os.path.splitext(src)[1].lstrip(".")
+            stats["saved"][extension] = stats["saved"].get(extension, 0) + size - len(data)
+        elif needs_copy(src, dst, checksum):
+            logger.debug(f"Copying: {src} to {dst}")
+            copy_file(src, dst, link)
+            stats["copied"] += 1
+            stats["bytes_copied"] += size
+        else:
+            stats["skipped"] += 1
+            stats["bytes_skipped"] += size
+    return stats
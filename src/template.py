@@ -0,0 +1,107 @@
+from htmlnode import HTMLNode, write_html
+from minify import minify_html
+import io
+import os
+import re
+
+placeholder_pattern = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}")
+include_pattern = re.compile(r'\{%\s*include\s+"([^"]+)"\s*%\}')
+extends_pattern = re.compile(r'\s*\{%\s*extends\s+"([^"]+)"\s*%\}')
+# blocks do not nest
+block_pattern = re.compile(r"\{%\s*block\s+(\w+)\s*%\}(.*?)\{%\s*endblock(?:\s+\w+)?\s*%\}", re.DOTALL)
+
+class Template:
+    def __init__(self, source, name=None, dependencies=None) -> None:
+        self.name = name
+        # every file the source was put together from, the template itself first
+        self.dependencies = dependencies or ([name] if name else [])
+        # compiled once: literals[i] is followed by slots[i], the last literal closes the document
+        self.literals = []
+        self.slots = []
+        pos = 0
+        for match in placeholder_pattern.finditer(source):
+            self.literals.append(source[pos:match.start()])
+            self.slots.append((match.group(1), match.group(0)))
+            pos = match.end()
+        self.literals.append(source[pos:])
+
+    def render(self, variables):
+        buffer = io.StringIO()
+        self.render_to(buffer, variables)
+        return buffer.getvalue()
+
+    def render_to(self, sink, variables):
+        # unknown placeholders are left in the output untouched, node values are
+        # streamed into the sink rather than rendered to a string first
+        sink.write(self.literals[0])
+        for (slot, raw), literal in zip(self.slots, self.literals[1:]):
+            value = variables.get(slot, raw)
+            if isinstance(value, HTMLNode):
+                write_html(value, sink)
+            else:
+                sink.write(str(value))
+            sink.write(literal)
+
+    def __repr__(self) -> str:
+        return f"Template({self.name}, {[slot for slot, _ in self.slots]})"
+
+def expand_template(path, dependencies, including=()):
+    # {% include "name" %} is replaced by that file and {% extends "name" %}
+    # fills the named file's blocks with this one's; names are relative to the
+    # file they appear in. Block markers are left in for a template extending
+    # this one, load_template strips them.
+    if path in including:
+        raise Exception(f"Template {path} includes itself: {" -> ".join([*including, path])}")
+    # stat before reading, so an edit made while compiling is seen next time
+    dependencies.append((path, os.stat(path).st_mtime_ns))
+    with open(path) as f:
+        source = f.read()
+
+    def resolve(name):
+        return os.path.normpath(os.path.join(os.path.dirname(path), name))
+
+    source = include_pattern.sub(lambda match: expand_template(resolve(match.group(1)), dependencies, (*including, path)), source)
+    parent = extends_pattern.match(source)
+    if parent:
+        # anything outside the blocks of a template that extends another is dropped
+        blocks = {match.group(1): match.group(2) for match in block_pattern.finditer(source)}
+        source = expand_template(resolve(parent.group(1)), dependencies, (*including, path))
+        source = block_pattern.sub(lambda match: f"{{% block {match.group(1)} %}}{blocks.get(match.group(1), match.group(2))}{{% endblock %}}", source)
+    return source
+
+def layout_for(src, content_dir, template_path, layouts_dir):
+    # the nearest layouts_dir/<section>.html above the page: content/blog/2024/post.md
+    # looks for blog/2024.html, then blog.html, then falls back to template_path
+    section = os.path.relpath(os.path.dirname(src), content_dir)
+    while section not in ("", "."):
+        path = os.path.join(layouts_dir, section + ".html")
+        if os.path.isfile(path):
+            return path
+        section = os.path.dirname(section)
+    return template_path
+
+template_cache = {}
+
+def load_template(path, assets=None, minify=False):
+    # assets (an assets.Assets) rewrites src/href references to fingerprinted
+    # names and minify strips the source's whitespace, both once, at compile time;
+    # the compiled template stays valid while none of its files change
+    cached = template_cache.get((path, minify))
+    version = assets.version if assets else None
+    if cached and cached[0] == version:
+        try:
+            if all(os.stat(file).st_mtime_ns == mtime for file, mtime in cached[2]):
+                return cached[1]
+        except FileNotFoundError:
+            pass
+
+    dependencies = []
+    source = expand_template(os.path.normpath(path), dependencies)
+    source = block_pattern.sub(lambda match: match.group(2), source)
+    if assets:
+        source = assets.rewrite_html(source)
+    if minify:
+        source = minify_html(source)
+    template = Template(source, path, list(dict.fromkeys(file for file, _ in dependencies)))
+    template_cache[(path, minify)] = (version, template, dependencies)
+    return template
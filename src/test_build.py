@@ -0,0 +1,355 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import compress
+import main
+from main import build, generate_page, stream_page
+from manifest import Manifest
+from search import SearchIndex
+from watch import snapshot, changed_paths
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(self.path("content", "blog"))
+        os.makedirs(self.path("static"))
+        self.write(self.path("content", "index.md"), "# Home\n\nWelcome")
+        self.write(self.path("content", "blog", "post.md"), "# Post\n\nSome *text*")
+        self.write(self.path("static", "index.css"), "body {}")
+        self.write(self.path("template.html"), "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, jobs=1):
+        summary = build(self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"), jobs=jobs)
+        self.assertEqual([], summary.pop("errors"))
+        self.bytes = (summary.pop("bytes_copied"), summary.pop("bytes_skipped"))
+        return summary
+
+    def read_outputs(self):
+        outputs = {}
+        for root, _, names in os.walk(self.path("public")):
+            for name in names:
+                with open(os.path.join(root, name), "rb") as f:
+                    outputs[os.path.relpath(os.path.join(root, name), self.path("public"))] = f.read()
+        return outputs
+
+    def test_full_then_noop(self):
+        self.assertEqual({"copied": 1, "generated": 2, "removed": 0, "unchanged": 0}, self.build())
+        self.assertEqual({"copied": 0, "generated": 0, "removed": 0, "unchanged": 3}, self.build())
+        with open(self.path("public", "blog", "post.html")) as f:
+            self.assertEqual("<title>Post</title><div><h1><p>Post</p></h1><p>Some <i>text</i></p></div>", f.read())
+
+    def test_changed_page(self):
+        self.build()
+        self.write(self.path("content", "index.md"), "# Home\n\nWelcome back")
+        self.assertEqual({"copied": 0, "generated": 1, "removed": 0, "unchanged": 2}, self.build())
+
+    def test_template_change_rebuilds_all(self):
+        self.build()
+        self.write(self.path("template.html"), "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(2, self.build()["generated"])
+
+    def test_section_layout_change_rebuilds_section(self):
+        os.makedirs(self.path("templates", "partials"))
+        self.write(self.path("template.html"), '<title>{{ Title }}</title>{% block body %}{{ Content }}{% endblock %}{% include "templates/partials/footer.html" %}')
+        self.write(self.path("templates", "partials", "footer.html"), "<footer></footer>")
+        self.assertEqual(2, self.build()["generated"])
+
+        # a new section layout takes over that section's pages only
+        self.write(self.path("templates", "blog.html"), '{% extends "../template.html" %}{% block body %}<article>{{ Content }}</article>{% endblock %}')
+        self.assertEqual(1, self.build()["generated"])
+        with open(self.path("public", "blog", "post.html")) as f:
+            self.assertEqual("<title>Post</title><article><div><h1><p>Post</p></h1><p>Some <i>text</i></p></div></article><footer></footer>", f.read())
+        manifest = Manifest(self.path(".cache", "manifest.json"))
+        self.assertEqual([self.path("content", "blog", "post.md")], manifest.dependents([self.path("templates", "blog.html")]))
+        self.assertEqual(2, len(manifest.dependents([self.path("templates", "partials", "footer.html")])))
+
+        self.write(self.path("templates", "blog.html"), '{% extends "../template.html" %}{% block body %}<main>{{ Content }}</main>{% endblock %}')
+        self.assertEqual(1, self.build()["generated"])
+        self.write(self.path("templates", "partials", "footer.html"), "<footer>!</footer>")
+        self.assertEqual(2, self.build()["generated"])
+        self.assertEqual(0, self.build()["generated"])
+        os.remove(self.path("templates", "blog.html"))
+        self.assertEqual(1, self.build()["generated"])
+        with open(self.path("public", "blog", "post.html")) as f:
+            self.assertTrue(f.read().startswith("<title>Post</title><div>"))
+
+    def test_failed_rebuild_keeps_old_output(self):
+        self.write(self.path("content", "index.md"), "# Home\n\n" + "A paragraph repeated over and over. " * 50)
+        paths = (self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"))
+        build(*paths, compress=True)
+        with open(self.path("public", "index.html")) as f:
+            before = f.read()
+
+        self.write(self.path("content", "index.md"), "# Home\n\nAn *unclosed delimiter")
+        # rendered in memory, then streamed
+        for threshold in [main.stream_threshold, 0]:
+            threshold, main.stream_threshold = main.stream_threshold, threshold
+            try:
+                summary = build(*paths)
+            finally:
+                main.stream_threshold = threshold
+            self.assertEqual(1, len(summary["errors"]))
+            with open(self.path("public", "index.html")) as f:
+                self.assertEqual(before, f.read())
+            self.assertTrue(os.path.exists(self.path("public", "index.html.gz")))
+            self.assertEqual([], [name for name in os.listdir(self.path("public")) if name.endswith(".tmp")])
+
+    def test_removed_source(self):
+        self.build()
+        os.remove(self.path("content", "blog", "post.md"))
+        self.assertEqual(1, self.build()["removed"])
+        self.assertFalse(os.path.exists(self.path("public", "blog", "post.html")))
+
+    def test_static_sync(self):
+        self.build()
+        self.assertEqual((7, 0), self.bytes)
+        self.build()
+        self.assertEqual((0, 7), self.bytes)
+        self.write(self.path("static", "index.css"), "body { color: red }")
+        self.assertEqual(1, self.build()["copied"])
+        with open(self.path("public", "index.css")) as f:
+            self.assertEqual("body { color: red }", f.read())
+        os.remove(self.path("static", "index.css"))
+        self.assertEqual(1, self.build()["removed"])
+        self.assertFalse(os.path.exists(self.path("public", "index.css")))
+
+    def test_only_changed_paths(self):
+        self.build()
+        before = snapshot([self.path("content"), self.path("static"), self.path("template.html")])
+        self.write(self.path("content", "blog", "post.md"), "# Post\n\nEdited")
+        os.remove(self.path("content", "index.md"))
+        after = snapshot([self.path("content"), self.path("static"), self.path("template.html")])
+        changed = changed_paths(before, after)
+        self.assertEqual({self.path("content", "blog", "post.md"), self.path("content", "index.md")}, changed)
+
+        manifest = Manifest(self.path(".cache", "manifest.json"))
+        summary = build(self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), manifest.path, manifest=manifest, only=changed)
+        self.assertEqual((1, 1, 0), (summary["generated"], summary["removed"], summary["copied"]))
+        self.assertFalse(os.path.exists(self.path("public", "index.html")))
+
+    def test_precompress(self):
+        self.write(self.path("content", "index.md"), "# Home\n\n" + "A paragraph repeated over and over. " * 50)
+        summary = build(self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"), compress=True)
+        self.assertEqual(1, summary["compression"]["files"])
+        with gzip.open(self.path("public", "index.html.gz")) as f, open(self.path("public", "index.html"), "rb") as g:
+            self.assertEqual(g.read(), f.read())
+        # too small to pay off
+        self.assertFalse(os.path.exists(self.path("public", "index.css.gz")))
+
+        os.remove(self.path("content", "index.md"))
+        build(self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"), compress=True)
+        self.assertFalse(os.path.exists(self.path("public", "index.html.gz")))
+
+    def test_incompressible_outputs_are_not_compressed_again(self):
+        with open(self.path("static", "noise.txt"), "wb") as f:
+            f.write(os.urandom(4096))
+        paths = (self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"))
+        compressed = []
+        encoders = compress.encoders
+
+        def counting():
+            return [(suffix, lambda data, encode=encode: compressed.append(len(data)) or encode(data)) for suffix, encode in encoders()]
+
+        compress.encoders = counting
+        try:
+            build(*paths, compress=True)
+            self.assertEqual(len(encoders()), len(compressed))
+            self.assertFalse(os.path.exists(self.path("public", "noise.txt.gz")))
+            self.assertIn(self.path("public", "noise.txt.gz"), Manifest(paths[-1]).incompressible)
+
+            # unchanged, the earlier decision stands; rewritten, it is compressed again
+            build(*paths, compress=True)
+            self.assertEqual(len(encoders()), len(compressed))
+            with open(self.path("static", "noise.txt"), "wb") as f:
+                f.write(os.urandom(4096))
+            build(*paths, compress=True)
+            self.assertEqual(2 * len(encoders()), len(compressed))
+
+            os.remove(self.path("static", "noise.txt"))
+            build(*paths, compress=True)
+            self.assertEqual({}, Manifest(paths[-1]).incompressible)
+        finally:
+            compress.encoders = encoders
+
+    def test_rewritten_outputs_drop_stale_compressed_copies(self):
+        self.write(self.path("content", "index.md"), "# Home\n\n" + "A paragraph repeated over and over. " * 50)
+        self.write(self.path("static", "index.css"), "body { color: red }\n" * 50)
+        paths = (self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"))
+        build(*paths, compress=True)
+        self.assertTrue(os.path.exists(self.path("public", "index.html.gz")))
+        self.assertTrue(os.path.exists(self.path("public", "index.css.gz")))
+
+        # a build without --precompress must not leave the old bodies to be served
+        self.write(self.path("content", "index.md"), "# Home\n\n" + "Another paragraph, edited. " * 50)
+        self.write(self.path("static", "index.css"), "body { color: blue }\n" * 50)
+        for pipeline in [0, 4]:
+            build(*paths, pipeline=pipeline)
+            self.assertFalse(os.path.exists(self.path("public", "index.html.gz")))
+            self.assertFalse(os.path.exists(self.path("public", "index.css.gz")))
+            build(*paths, compress=True)
+            self.write(self.path("content", "index.md"), "# Home\n\n" + "Edited once more. " * 60)
+            self.write(self.path("static", "index.css"), "body { color: green }\n" * 50)
+        with gzip.open(self.path("public", "index.css.gz")) as f, open(self.path("public", "index.css"), "rb") as g:
+            self.assertEqual(g.read(), f.read())
+
+    def test_fingerprint(self):
+        self.write(self.path("template.html"), '<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+        self.write(self.path("content", "index.md"), "# Home\n\n![style](/index.css) [raw](/index.css)")
+        paths = (self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"))
+        build(*paths, fingerprint=True)
+        with open(self.path("public", "asset-manifest.json")) as f:
+            mapping = json.load(f)
+        fingerprinted = mapping["/index.css"]
+        self.assertRegex(fingerprinted, r"^/index\.[0-9a-f]{8}\.css$")
+        self.assertTrue(os.path.exists(self.path("public", fingerprinted.lstrip("/"))))
+        with open(self.path("public", "index.html")) as f:
+            html = f.read()
+        self.assertEqual(3, html.count(fingerprinted))
+
+        # unchanged assets keep their names, a changed one renames and re-renders every page
+        summary = build(*paths, fingerprint=True)
+        self.assertEqual(0, summary["generated"])
+        self.write(self.path("static", "index.css"), "body { color: red }")
+        summary = build(*paths, fingerprint=True)
+        self.assertEqual(2, summary["generated"])
+        self.assertFalse(os.path.exists(self.path("public", fingerprinted.lstrip("/"))))
+
+        build(*paths)
+        self.assertFalse(os.path.exists(self.path("public", "asset-manifest.json")))
+        with open(self.path("public", "index.html")) as f:
+            self.assertIn('href="/index.css"', f.read())
+
+    def test_search_index(self):
+        paths = (self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"))
+        index_path = self.path(".cache", "search.pickle")
+        # pages built before the index existed are rendered once more to be indexed
+        build(*paths)
+        summary = build(*paths, search=SearchIndex(index_path))
+        self.assertEqual(2, summary["generated"])
+        self.assertEqual(2, summary["search"]["docs"])
+        with open(self.path("public", "search", "te.json")) as f:
+            self.assertEqual({"text": [1]}, json.load(f))
+        with open(self.path("public", "search", "docs.json")) as f:
+            self.assertEqual([["/", "Home"], ["/blog/post.html", "Post"]], json.load(f))
+        self.assertTrue(os.path.exists(self.path("public", "search", "search.js")))
+
+        summary = build(*paths, search=SearchIndex(index_path))
+        self.assertEqual((0, 0), (summary["generated"], summary["search"]["shards_written"]))
+        # search.js is left alone when it has not changed
+        client = self.path("public", "search", "search.js")
+        os.utime(client, ns=(0, 0))
+        build(*paths, search=SearchIndex(index_path))
+        self.assertEqual(0, os.stat(client).st_mtime_ns)
+
+        # a page rebuilt without --search is indexed again by the next --search build
+        self.write(self.path("content", "blog", "post.md"), "# Post\n\nSome text again")
+        build(*paths)
+        summary = build(*paths, search=SearchIndex(index_path))
+        self.assertEqual(1, summary["generated"])
+        with open(self.path("public", "search", "ag.json")) as f:
+            self.assertEqual({"again": [1]}, json.load(f))
+
+        os.remove(self.path("content", "blog", "post.md"))
+        build(*paths, search=SearchIndex(index_path))
+        self.assertFalse(os.path.exists(self.path("public", "search", "te.json")))
+
+        # a page deleted by a build without --search is dropped by the next --search build
+        self.write(self.path("content", "other.md"), "# Other\n\nA hobbit")
+        build(*paths, search=SearchIndex(index_path))
+        with open(self.path("public", "search", "ho.json")) as f:
+            self.assertIn("hobbit", json.load(f))
+        os.remove(self.path("content", "other.md"))
+        build(*paths)
+        build(*paths, search=SearchIndex(index_path))
+        with open(self.path("public", "search", "docs.json")) as f:
+            self.assertEqual(["/"], [doc[0] for doc in json.load(f) if doc])
+        with open(self.path("public", "search", "ho.json")) as f:
+            self.assertNotIn("hobbit", json.load(f))
+
+    def test_minify(self):
+        paths = (self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"))
+        self.write(self.path("template.html"), "<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+        self.write(self.path("static", "index.css"), "body {\n  color: red;\n}\n")
+        self.write(self.path("content", "index.md"), "# Home\n\n```\n  indented\n    code\n```")
+        summary = build(*paths, minify=True)
+        self.assertEqual({"css": 8, "html": 2 * 13}, summary["saved"])
+        with open(self.path("public", "index.html")) as f:
+            self.assertEqual("<html><body><div><h1><p>Home</p></h1><pre><code>\n  indented\n    code\n</code></pre></div></body></html>", f.read())
+        with open(self.path("public", "index.css")) as f:
+            self.assertEqual("body{color:red}", f.read())
+
+        # turning minification off or on rewrites every page and stylesheet
+        summary = build(*paths, minify=True)
+        self.assertEqual((0, 0), (summary["generated"], summary["copied"]))
+        summary = build(*paths)
+        self.assertEqual((2, 1), (summary["generated"], summary["copied"]))
+        with open(self.path("public", "index.css")) as f:
+            self.assertEqual("body {\n  color: red;\n}\n", f.read())
+        summary = build(*paths, minify=True)
+        self.assertEqual((2, 1), (summary["generated"], summary["copied"]))
+
+    def test_parallel_matches_serial(self):
+        for i in range(8):
+            self.write(self.path("content", "blog", f"post{i}.md"), f"# Post {i}\n\n* one\n* **two**\n\n```code {i}```")
+        self.build()
+        serial = self.read_outputs()
+        os.remove(self.path(".cache", "manifest.json"))
+        self.build(jobs=4)
+        self.assertEqual(serial, self.read_outputs())
+
+    def test_pipeline_matches_serial(self):
+        for i in range(10):
+            self.write(self.path("content", f"page{i}.md"), f"# Page {i}\n\nText {i}")
+        self.build()
+        serial = self.read_outputs()
+        summary = build(self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"), force=True, pipeline=4)
+        self.assertEqual(([], 12), (summary["errors"], summary["generated"]))
+        self.assertEqual(serial, self.read_outputs())
+
+    def test_errors_are_collected(self):
+        self.write(self.path("content", "broken.md"), "No title here")
+        summary = build(self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"), jobs=2)
+        self.assertEqual(2, summary["generated"])
+        self.assertEqual([self.path("content", "broken.md")], [src for src, _ in summary["errors"]])
+
+    def test_stream_page_matches(self):
+        template = self.path("template.html")
+        pages = {
+            "plain.md": "Intro\n\n# Title\n\n```\ncode\n\nmore\n```\n\n* one\n* two\n\n> quote",
+            "front.md": "---\nTitle: From front matter\n---\n# Heading\n\nBody **bold**",
+            "unclosed.md": "---\nTitle: x\n\n# Heading",
+        }
+        for name, markdown in pages.items():
+            self.write(self.path(name), markdown)
+            info = generate_page(self.path(name), template, self.path("whole.html"), index=True)
+            self.assertEqual(info, stream_page(self.path(name), template, self.path("streamed.html"), index=True) | {"seconds": info["seconds"]})
+            with open(self.path("whole.html")) as whole, open(self.path("streamed.html")) as streamed:
+                self.assertEqual(whole.read(), streamed.read(), name)
+
+    def test_large_pages_are_streamed(self):
+        threshold, main.stream_threshold = main.stream_threshold, 0
+        try:
+            summary = build(self.path("static"), self.path("content"), self.path("template.html"), self.path("public"), self.path(".cache", "manifest.json"))
+        finally:
+            main.stream_threshold = threshold
+        self.assertEqual(([], 2), (summary["errors"], summary["generated"]))
+        with open(self.path("public", "blog", "post.html")) as f:
+            self.assertEqual("<title>Post</title><div><h1><p>Post</p></h1><p>Some <i>text</i></p></div>", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+from cache import BlockCache
+from textnode import markdown_to_document
+
+markdown = "# Title\n\nA **shared** disclaimer\n\n* one\n* two\n\nA **shared** disclaimer"
+
+class TestBlockCache(unittest.TestCase):
+    def test_same_html_as_uncached(self):
+        cache = BlockCache()
+        uncached = markdown_to_document(markdown)[0].to_html()
+        self.assertEqual(uncached, markdown_to_document(markdown, cache)[0].to_html())
+        self.assertEqual((1, 3), (cache.hits, cache.misses))
+        self.assertEqual(uncached, markdown_to_document(markdown, cache)[0].to_html())
+        self.assertEqual((5, 3), (cache.hits, cache.misses))
+
+    def test_lru_eviction(self):
+        cache = BlockCache(max_bytes=10)
+        cache.put(b"a", "12345")
+        cache.put(b"b", "12345")
+        cache.get(b"a")
+        cache.put(b"c", "12345")
+        self.assertEqual([b"a", b"c"], list(cache.entries))
+        self.assertEqual(10, cache.size)
+
+    def test_persisted_across_builds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.pickle")
+            cache = BlockCache(path)
+            markdown_to_document(markdown, cache)
+            cache.save()
+
+            cache = BlockCache(path)
+            markdown_to_document(markdown, cache)
+            self.assertEqual((4, 0), (cache.hits, cache.misses))
+
+    def test_loaded_on_first_use(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.pickle")
+            cache = BlockCache(path)
+            markdown_to_document(markdown, cache)
+            cache.save()
+
+            cache = BlockCache(path)
+            self.assertFalse(cache.loaded)
+            self.assertEqual((3, cache.stats()[1]), cache.stats())
+            self.assertFalse(cache.loaded)
+            cache.put(b"new", "<p>new</p>")
+            self.assertTrue(cache.loaded)
+            self.assertEqual(4, len(cache.entries))
+            self.assertEqual(b"new", list(cache.entries)[-1])
+
+    def test_parser_version_invalidates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.pickle")
+            cache = BlockCache(path)
+            markdown_to_document(markdown, cache)
+            cache.version = "older parser"
+            cache.save()
+            self.assertEqual(0, len(BlockCache(path).entries))
+
+    def test_take_and_merge(self):
+        worker, parent = BlockCache(collect=True), BlockCache()
+        markdown_to_document(markdown, worker)
+        parent.merge(worker.take())
+        self.assertEqual(3, len(parent.entries))
+        self.assertEqual((1, 3), (parent.hits, parent.misses))
+        self.assertEqual([], worker.added)
+
+    def test_added_only_collected_in_workers(self):
+        cache = BlockCache(max_bytes=1000)
+        for i in range(10000):
+            cache.put(str(i).encode(), "x" * 100)
+        cache.merge(([(b"merged", "y" * 100)], 0, 0))
+        self.assertEqual(1000, cache.size)
+        self.assertEqual([], cache.added)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import client
+from daemon import BuildDaemon, serve
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        os.makedirs(os.path.join("content", "blog"))
+        os.makedirs("static")
+        self.write(os.path.join("content", "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join("content", "blog", "post.md"), "# Post\n\nSome *text*")
+        self.write(os.path.join("static", "index.css"), "body {}")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+
+        self.daemon = BuildDaemon()
+        self.thread = threading.Thread(target=serve, args=(self.daemon,))
+        self.thread.start()
+        while not os.path.exists(client.socket_path):
+            time.sleep(0.005)
+
+    def tearDown(self):
+        if not self.daemon.stopped:
+            list(client.request(client.connect(), {"command": "stop"}))
+        self.thread.join()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, *argv):
+        replies = list(client.request(client.connect(), {"command": "build", "argv": list(argv), "cwd": os.getcwd()}))
+        return replies[-1]
+
+    def test_rebuilds_only_changed_paths(self):
+        summary = self.build("--incremental")["summary"]
+        self.assertEqual((2, 1, None), (summary["generated"], summary["copied"], summary["changed"]))
+
+        self.write(os.path.join("content", "index.md"), "# Home\n\nChanged")
+        summary = self.build("--incremental")["summary"]
+        self.assertEqual((1, [os.path.join("content", "index.md")]), (summary["generated"], summary["changed"]))
+        with open(os.path.join("public", "index.html")) as f:
+            self.assertIn("Changed", f.read())
+
+        summary = self.build()["summary"]
+        self.assertEqual(2, summary["generated"])
+
+    def test_errors_and_bad_arguments(self):
+        self.write(os.path.join("content", "broken.md"), "No title")
+        reply = self.build()
+        self.assertEqual(1, reply["exit"])
+        self.assertEqual([os.path.join("content", "broken.md")], [src for src, _ in reply["summary"]["errors"]])
+        self.assertEqual(2, self.build("--bogus")["exit"])
+
+    def test_stop(self):
+        self.assertEqual(0, client.main(["--stop"]))
+        self.thread.join()
+        self.assertFalse(os.path.exists(client.socket_path))
+        self.assertIsNone(client.connect())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import *
@@ -29,6 +30,38 @@ class TestTextNode(unittest.TestCase):
 
         self.assertEqual("<p><b>Bold text</b>Normal text<i>italic text</i>Normal text</p>", html)
 
+    def test_write_html(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "Normal text"), LeafNode("a", "link", {"href": "/"})]), LeafNode("b", "Bold")])
+        sink = io.StringIO()
+        write_html(node, sink)
+        self.assertEqual("<div><p>Normal text<a href=\"/\">link</a></p><b>Bold</b></div>", sink.getvalue())
+
+    def test_write_html_deep_tree(self):
+        node = LeafNode("b", "deep")
+        for _ in range(10000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len("<span></span>") * 10000 + len("<b>deep</b>"), len(html))
+
+    def test_write_html_requires_children(self):
+        with self.assertRaises(ValueError):
+            write_html(ParentNode("div", [ParentNode("p", [])]), io.StringIO())
+
+    def test_write_html_iterator_children(self):
+        pulled = []
+        def children():
+            for text in ["a", "b"]:
+                pulled.append(text)
+                yield ParentNode("p", [LeafNode(None, text)])
+        sink = io.StringIO()
+        write_html(ParentNode("div", children()), sink)
+        self.assertEqual("<div><p>a</p><p>b</p></div>", sink.getvalue())
+        self.assertEqual(["a", "b"], pulled)
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in [HTMLNode("p"), LeafNode("b", "Bold"), ParentNode("p", [LeafNode("b", "Bold")])]:
+            self.assertFalse(hasattr(node, "__dict__"))
 
 
 if __name__ == "__main__":
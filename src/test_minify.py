@@ -0,0 +1,20 @@
+import unittest
+
+from minify import minify_html, minify_css
+
+class TestMinify(unittest.TestCase):
+    def test_html_whitespace(self):
+        html = "<!DOCTYPE html>\n<html>\n  <body>\n    <p>Some  <b>bold</b>\n    <i>text</i> </p>\n    <article>\n        {{ Content }}\n    </article>\n  </body>\n</html>\n"
+        self.assertEqual("<!DOCTYPE html><html><body><p>Some <b>bold</b> <i>text</i></p><article>{{ Content }}</article></body></html>", minify_html(html))
+
+    def test_html_raw_elements_and_comments(self):
+        html = "<div>\n  <pre>  keep\n    this </pre>\n  <!-- note -->\n  <!--[if IE]>x<![endif]-->\n  <textarea> a  b </textarea>\n  <style>\n    a :hover { color : red; }\n  </style>\n</div>"
+        self.assertEqual("<div><pre>  keep\n    this </pre><!--[if IE]>x<![endif]--> <textarea> a  b </textarea> <style>a :hover{color :red}</style></div>", minify_html(html))
+
+    def test_css(self):
+        css = "/* header */\nh1,\nh2 > a {\n  font-family: \"Segoe  UI\", sans-serif;\n  width: calc(100% - 2px);\n}\n@media (max-width: 600px) {\n  a { content: '{ ; }'; }\n}\n"
+        self.assertEqual("h1,h2>a{font-family:\"Segoe  UI\",sans-serif;width:calc(100% - 2px)}@media (max-width:600px){a{content:'{ ; }'}}", minify_css(css))
+
+
+if __name__ == "__main__":
+    unittest.main()
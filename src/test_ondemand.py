@@ -0,0 +1,106 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import ondemand
+from ondemand import OnDemandSite
+
+class TestOnDemandSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write("index.md", "# Home\n\nWelcome")
+        self.write("blog/index.md", "# Blog\n\nPosts")
+        self.write("blog/post.md", "# Post\n\nText")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.site = OnDemandSite(self.content, self.template)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel, text):
+        with open(os.path.join(self.content, rel), "w") as f:
+            f.write(text)
+
+    def touch(self, rel, seconds):
+        path = os.path.join(self.content, rel)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10**9))
+
+    def test_source_for(self):
+        join = os.path.join
+        self.assertEqual(join(self.content, "index.md"), self.site.source_for("/"))
+        self.assertEqual(join(self.content, "blog", "index.md"), self.site.source_for("/blog/"))
+        self.assertEqual(join(self.content, "blog", "post.md"), self.site.source_for("/blog/post.html"))
+        self.assertEqual(join(self.content, "index.md"), self.site.source_for("/index.html"))
+        self.assertIsNone(self.site.source_for("/blog"))
+        self.assertIsNone(self.site.source_for("/missing.html"))
+        self.assertIsNone(self.site.source_for("/index.css"))
+        self.assertIsNone(self.site.source_for("/../template.html"))
+        self.assertTrue(self.site.is_section("/blog"))
+        self.assertFalse(self.site.is_section("/blog/post"))
+
+    def test_render_and_cache(self):
+        src = self.site.source_for("/blog/post.html")
+        page = self.site.page(src)
+        self.assertEqual(b"<title>Post</title><main><div><h1><p>Post</p></h1><p>Text</p></div></main>", page.body)
+        self.assertIs(page, self.site.page(src))
+        self.assertEqual(1, self.site.renders)
+
+        # a touch without a change keeps the body, an edit renders again
+        self.touch("blog/post.md", 1)
+        self.assertEqual(page.body, self.site.page(src).body)
+        self.assertEqual(1, self.site.renders)
+        self.write("blog/post.md", "# Post\n\nEdited")
+        self.touch("blog/post.md", 2)
+        self.assertIn(b"<p>Edited</p>", self.site.page(src).body)
+        self.assertEqual(2, self.site.renders)
+
+        with open(self.template, "w") as f:
+            f.write("<h2>{{ Title }}</h2>{{ Content }}")
+        st = os.stat(self.template)
+        os.utime(self.template, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertTrue(self.site.page(src).body.startswith(b"<h2>Post</h2>"))
+        self.assertEqual(3, self.site.renders)
+
+    def test_lru_is_bounded(self):
+        sources = [self.site.source_for(path) for path in ["/", "/blog/", "/blog/post.html"]]
+        sizes = [len(self.site.page(src).body) for src in sources]
+        site = OnDemandSite(self.content, self.template, max_bytes=sizes[0] + sizes[1])
+        site.page(sources[0])
+        site.page(sources[1])
+        site.page(sources[0])
+        site.page(sources[2])
+        self.assertEqual([sources[0], sources[2]], list(site.entries))
+        self.assertEqual(sizes[0] + sizes[2], site.size)
+
+    def test_concurrent_requests_are_coalesced(self):
+        src = self.site.source_for("/")
+        original = ondemand.render_page
+        started = threading.Event()
+
+        def slow_render(*args, **kwargs):
+            started.set()
+            time.sleep(0.1)
+            return original(*args, **kwargs)
+
+        ondemand.render_page = slow_render
+        try:
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(self.site.page(src))) for _ in range(8)]
+            threads[0].start()
+            started.wait()
+            for thread in threads[1:]:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            ondemand.render_page = original
+        self.assertEqual(1, self.site.renders)
+        self.assertEqual(8, len(results))
+        self.assertTrue(all(page is results[0] for page in results))
@@ -0,0 +1,51 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from pack import Pack, write_pack
+
+class TestPack(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.public, "blog"))
+        self.files = {"/index.html": b"<p>home</p>" * 50, "/blog/post.html": b"<p>post</p>", "/empty.txt": b"", "/café.css": b"a{}"}
+        for path, data in self.files.items():
+            with open(os.path.join(self.public, path.lstrip("/")), "wb") as f:
+                f.write(data)
+        with open(os.path.join(self.public, "index.html.gz"), "wb") as f:
+            f.write(gzip.compress(self.files["/index.html"]))
+        self.pack_path = os.path.join(self.tmp.name, "site.pack")
+        self.stats = write_pack(self.public, self.pack_path)
+        self.pack = Pack(self.pack_path)
+
+    def tearDown(self):
+        self.pack.close()
+        self.tmp.cleanup()
+
+    def test_lookup_and_bodies(self):
+        self.assertEqual(4, self.stats["files"])
+        self.assertEqual(sorted(self.files, key=str.encode), list(self.pack))
+        for path, data in self.files.items():
+            entry = self.pack.find(path)
+            self.assertEqual(data, bytes(self.pack.body(entry)))
+        self.assertIsNone(self.pack.find("/index.html.gz"))
+        self.assertIsNone(self.pack.find("/blog"))
+        self.assertIsNone(self.pack.find("/zzz"))
+
+    def test_siblings_become_encodings(self):
+        entry = self.pack.find("/index.html")
+        self.assertEqual({"identity", "gzip"}, set(entry.bodies))
+        self.assertEqual(self.files["/index.html"], gzip.decompress(self.pack.body(entry, "gzip")))
+        self.assertNotEqual(entry.etag, self.pack.find("/blog/post.html").etag)
+
+    def test_not_a_pack(self):
+        with open(self.pack_path, "wb") as f:
+            f.write(b"x" * 64)
+        with self.assertRaises(ValueError):
+            Pack(self.pack_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
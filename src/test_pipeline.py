@@ -0,0 +1,54 @@
+import threading
+import time
+import unittest
+
+from pipeline import run_pipeline
+
+class TestPipeline(unittest.TestCase):
+    def test_order_and_errors(self):
+        written = []
+
+        def read(item):
+            # later items finish reading first
+            time.sleep((10 - item) / 1000)
+            if item == 3:
+                raise OSError("unreadable")
+            return item
+
+        def process(item, data):
+            if item == 5:
+                raise ValueError("bad")
+            return data * 2, str(data)
+
+        def write(item, output):
+            if item == 7:
+                raise OSError("disk full")
+            written.append(output)
+
+        results = list(run_pipeline(range(10), read, process, write, threads=4, depth=3))
+        self.assertEqual(list(range(10)), [item for item, _, _ in results])
+        self.assertEqual([None, None, None, "OSError", None, "ValueError", None, "OSError", None, None], [type(error).__name__ if error else None for _, _, error in results])
+        self.assertEqual([0, 2, 4, None, 8, None, 12, 14, 16, 18], [result for _, result, _ in results])
+        self.assertEqual(["0", "1", "2", "4", "6", "8", "9"], sorted(written))
+
+    def test_backpressure(self):
+        lock, in_flight, most = threading.Lock(), [0], [0]
+
+        def read(item):
+            with lock:
+                in_flight[0] += 1
+                most[0] = max(most[0], in_flight[0])
+            return item
+
+        def process(item, data):
+            time.sleep(0.001)
+            with lock:
+                in_flight[0] -= 1
+            return data, data
+
+        list(run_pipeline(range(50), read, process, lambda item, output: None, threads=8, depth=4))
+        self.assertLessEqual(most[0], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+
+import profiler
+from htmlnode import LeafNode, ParentNode
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_disabled_hooks_are_noops(self):
+        with profiler.span("parse", src="a.md"):
+            pass
+        with profiler.page("a.md") as stats:
+            stats["nodes"] = 1
+        self.assertIsNone(profiler.active)
+
+    def test_spans_and_pages(self):
+        active = profiler.enable()
+        with profiler.page("a.md") as stats:
+            with profiler.span("parse", src="a.md"):
+                stats["nodes"] = profiler.count_nodes(ParentNode("p", [LeafNode("b", "x"), LeafNode(None, "y")]))
+        self.assertEqual(["parse", "page"], [event["name"] for event in active.events])
+        self.assertEqual(3, active.pages[0]["nodes"])
+        self.assertEqual("a.md", active.slowest_pages(1)[0]["src"])
+
+    def test_chrome_trace(self):
+        active = profiler.enable()
+        with profiler.span("discover"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            active.write_chrome_trace(path)
+            with open(path) as f:
+                event = json.load(f)["traceEvents"][0]
+        self.assertEqual(("discover", "X"), (event["name"], event["ph"]))
+
+    def test_take_and_merge(self):
+        worker = profiler.Profiler()
+        with worker.page("a.md"):
+            pass
+        parent = profiler.Profiler()
+        parent.merge(worker.take())
+        self.assertEqual(1, len(parent.pages))
+        self.assertEqual([], worker.events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+import unittest
+
+from cache import BlockCache
+from search import SearchIndex, document_terms, delta_encode, page_url
+from textnode import markdown_to_document
+
+class TestSearch(unittest.TestCase):
+    def test_document_terms(self):
+        node = markdown_to_document("# The Hobbit\n\nIn a **hole** in the ground\n\n![a Dragon](/smaug.png)")[0]
+        self.assertEqual(["dragon", "ground", "hobbit", "hole"], document_terms(node))
+
+    def test_cached_blocks_give_same_terms(self):
+        markdown = "# Title\n\nSome `code` and [a link](/x)\n\n* one\n* two\n\n![rivendell valley](/r.png)"
+        cache = BlockCache()
+        markdown_to_document(markdown, cache)
+        uncached = document_terms(markdown_to_document(markdown)[0])
+        self.assertEqual(uncached, document_terms(markdown_to_document(markdown, cache)[0]))
+
+    def test_delta_encode(self):
+        self.assertEqual([2, 3, 10], delta_encode({15, 2, 5}))
+
+    def test_page_url(self):
+        self.assertEqual("/blog/", page_url(os.path.join("public", "blog", "index.html"), "public"))
+        self.assertEqual("/blog/post.html", page_url(os.path.join("public", "blog", "post.html"), "public"))
+
+    def test_incremental_shards(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SearchIndex(os.path.join(tmp, "search.pickle"))
+            index.update("a.md", "/a.html", "A", ["apple", "banana"])
+            index.update("b.md", "/b.html", "B", ["banana", "cherry"])
+            self.assertEqual(3, index.write(tmp)["shards_written"])
+            with open(os.path.join(tmp, "search", "ba.json")) as f:
+                self.assertEqual({"banana": [0, 1]}, json.load(f))
+            index.save()
+
+            index = SearchIndex(os.path.join(tmp, "search.pickle"))
+            index.update("b.md", "/b.html", "B", ["banana", "cranberry"])
+            self.assertEqual(1, index.write(tmp)["shards_written"])
+            self.assertFalse(os.path.exists(os.path.join(tmp, "search", "ch.json")))
+
+            index.remove("a.md")
+            index.update("c.md", "/c.html", "C", ["apple"])
+            index.write(tmp)
+            with open(os.path.join(tmp, "search", "docs.json")) as f:
+                self.assertEqual([["/c.html", "C"], ["/b.html", "B"]], json.load(f))
+
+
+if __name__ == "__main__":
+    unittest.main()
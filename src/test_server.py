@@ -0,0 +1,156 @@
+import functools
+import gzip
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pack import Pack, write_pack
+from server import FileCache, PackHTTPRequestHandler, ProductionHTTPRequestHandler, ProductionHTTPServer, accepted_encodings
+
+def quiet(handler_class):
+    # no request log on stderr while the tests run
+    return type(handler_class.__name__, (handler_class,), {"log_message": lambda self, *args: None})
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.public, "blog"))
+        self.home = b"<p>home</p>" * 50
+        self.write("index.html", self.home)
+        self.write("index.html.gz", gzip.compress(self.home))
+        self.write("blog/index.html", b"<p>blog</p>")
+        self.write("index.3f9a1c2b.css", b"a{}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel, data):
+        with open(os.path.join(self.public, rel), "wb") as f:
+            f.write(data)
+
+    def serve(self, handler_class, **kwargs):
+        httpd = ProductionHTTPServer(("127.0.0.1", 0), functools.partial(quiet(handler_class), directory=self.public), **kwargs)
+        thread = threading.Thread(target=httpd.serve_forever, args=(0.05,))
+        thread.start()
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(httpd.shutdown)
+        return httpd
+
+    def get(self, httpd, path, **headers):
+        connection = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=5)
+        self.addCleanup(connection.close)
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        return response, response.read()
+
+    def test_etag_and_not_modified(self):
+        httpd = self.serve(ProductionHTTPRequestHandler)
+        response, body = self.get(httpd, "/")
+        self.assertEqual(200, response.status)
+        self.assertEqual(self.home, body)
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        etag = response.getheader("ETag")
+
+        response, body = self.get(httpd, "/", **{"If-None-Match": etag})
+        self.assertEqual(304, response.status)
+        self.assertEqual(b"", body)
+        self.assertEqual(etag, response.getheader("ETag"))
+
+        # an edit changes the tag, the old one no longer matches
+        self.write("index.html", b"<p>edited</p>")
+        response, body = self.get(httpd, "/index.html", **{"If-None-Match": etag})
+        self.assertEqual(200, response.status)
+        self.assertEqual(b"<p>edited</p>", body)
+        self.assertNotEqual(etag, response.getheader("ETag"))
+
+        response, _ = self.get(httpd, "/blog")
+        self.assertEqual(301, response.status)
+        self.assertEqual(404, self.get(httpd, "/missing.html")[0].status)
+
+    def test_precompressed_sibling(self):
+        httpd = self.serve(ProductionHTTPRequestHandler)
+        response, body = self.get(httpd, "/", **{"Accept-Encoding": "br, gzip"})
+        self.assertEqual("gzip", response.getheader("Content-Encoding"))
+        self.assertEqual("Accept-Encoding", response.getheader("Vary"))
+        self.assertEqual("text/html", response.getheader("Content-Type"))
+        self.assertEqual(self.home, gzip.decompress(body))
+        gzip_etag = response.getheader("ETag")
+
+        response, body = self.get(httpd, "/", **{"Accept-Encoding": "gzip;q=0"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(self.home, body)
+        self.assertNotEqual(gzip_etag, response.getheader("ETag"))
+
+    def test_fingerprinted_files_are_immutable(self):
+        httpd = self.serve(ProductionHTTPRequestHandler)
+        response, _ = self.get(httpd, "/index.3f9a1c2b.css")
+        self.assertEqual("public, max-age=31536000, immutable", response.getheader("Cache-Control"))
+        response, _ = self.get(httpd, "/index.3f9a1c2b.css", **{"If-None-Match": response.getheader("ETag")})
+        self.assertEqual(304, response.status)
+        self.assertEqual("public, max-age=31536000, immutable", response.getheader("Cache-Control"))
+        response, _ = self.get(httpd, "/")
+        self.assertIsNone(response.getheader("Cache-Control"))
+
+    def test_pack(self):
+        pack_path = os.path.join(self.tmp.name, "site.pack")
+        write_pack(self.public, pack_path)
+        httpd = self.serve(PackHTTPRequestHandler)
+        httpd.pack = Pack(pack_path)
+        self.addCleanup(httpd.pack.close)
+
+        response, body = self.get(httpd, "/", **{"Accept-Encoding": "gzip"})
+        self.assertEqual("gzip", response.getheader("Content-Encoding"))
+        self.assertEqual("Accept-Encoding", response.getheader("Vary"))
+        self.assertEqual(self.home, gzip.decompress(body))
+        response, _ = self.get(httpd, "/", **{"Accept-Encoding": "gzip", "If-None-Match": response.getheader("ETag")})
+        self.assertEqual(304, response.status)
+
+        response, body = self.get(httpd, "/blog/")
+        self.assertEqual(b"<p>blog</p>", body)
+        self.assertIsNone(response.getheader("Vary"))
+        response, _ = self.get(httpd, "/blog")
+        self.assertEqual(301, response.status)
+        self.assertEqual("/blog/", response.getheader("Location"))
+        self.assertEqual(404, self.get(httpd, "/index.html.gz")[0].status)
+
+    def test_accepted_encodings(self):
+        self.assertEqual({"gzip", "br"}, accepted_encodings("gzip, BR;q=0.5"))
+        self.assertEqual({"br"}, accepted_encodings("gzip;q=0, br"))
+        self.assertEqual({"gzip"}, accepted_encodings("gzip;q=0.0x"))
+        self.assertEqual(set(), accepted_encodings(""))
+
+    def test_file_cache_is_bounded(self):
+        cache = FileCache(max_bytes=1000)
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(self.public, f"{i}.txt"))
+            self.write(f"{i}.txt", bytes([65 + i]) * 400)
+        stat = [os.stat(path) for path in paths]
+        body, etag = cache.get(paths[0], stat[0])
+        self.assertEqual(b"A" * 400, body)
+        cache.get(paths[1], stat[1])
+        # a hit moves the first file to the end, so the second one is evicted
+        self.assertEqual((body, etag), cache.get(paths[0], stat[0]))
+        cache.get(paths[2], stat[2])
+        self.assertEqual([paths[0], paths[2]], list(cache.entries))
+        self.assertEqual(800, cache.size)
+
+        # a changed file is read again rather than served from the cache
+        self.write("0.txt", b"changed")
+        st = os.stat(paths[0])
+        os.utime(paths[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        body, changed_etag = cache.get(paths[0], os.stat(paths[0]))
+        self.assertEqual(b"changed", body)
+        self.assertNotEqual(etag, changed_etag)
+        self.assertEqual(407, cache.size)
+
+
+if __name__ == "__main__":
+    unittest.main()
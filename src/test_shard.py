@@ -0,0 +1,103 @@
+import argparse
+import os
+import tempfile
+import unittest
+
+from main import build, find_pages
+from manifest import Manifest
+from shard import parse_shard, shard_of, shard_dir, write_partial_manifest, merge_shards, run_local
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(self.path("content", "blog"))
+        os.makedirs(self.path("static"))
+        for i in range(12):
+            self.write(self.path("content", "blog", f"post{i}.md"), f"# Post {i}\n\nText {i}")
+        self.write(self.path("static", "index.css"), "body {}")
+        self.write(self.path("template.html"), "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read_tree(self, directory):
+        outputs = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                with open(os.path.join(root, name), "rb") as f:
+                    outputs[os.path.relpath(os.path.join(root, name), directory)] = f.read()
+        return outputs
+
+    def build_shards(self, count, compress=False):
+        dirs = []
+        for shard in [(index, count) for index in range(1, count + 1)]:
+            dest, manifest = shard_dir(self.path("public"), shard), Manifest(self.path(".cache", f"manifest.{shard[0]}.json"))
+            build(self.path("static"), self.path("content"), self.path("template.html"), dest, manifest.path, manifest=manifest, compress=compress, shard=shard)
+            write_partial_manifest(dest, shard, manifest)
+            dirs.append(dest)
+        return dirs
+
+    def test_parse_shard(self):
+        self.assertEqual((2, 4), parse_shard("2/4"))
+        for text in ["0/4", "5/4", "4", "a/b"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(text)
+
+    def test_partition_is_deterministic_and_complete(self):
+        pages = find_pages(self.path("content"), self.path("public"))
+        owners = [shard_of(src, self.path("content"), 3) for src, _ in pages]
+        self.assertEqual(owners, [shard_of(os.path.join("content", os.path.relpath(src, self.path("content"))), "content", 3) for src, _ in pages])
+        self.assertEqual({1, 2, 3}, set(owners))
+
+    def test_merge_matches_single_build(self):
+        build(self.path("static"), self.path("content"), self.path("template.html"), self.path("single"), self.path(".cache", "manifest.json"))
+        summary = merge_shards(self.build_shards(3), self.path("public"))
+        self.assertEqual(([], [], 13), (summary["errors"], summary["conflicts"], summary["files"]))
+        self.assertEqual(self.read_tree(self.path("single")), self.read_tree(self.path("public")))
+
+        # a page that moved away is removed from public/ by the next merge
+        os.remove(self.path("content", "blog", "post0.md"))
+        merge_shards(self.build_shards(3), self.path("public"))
+        self.assertFalse(os.path.exists(self.path("public", "blog", "post0.html")))
+
+    def test_incremental_precompressed_shards(self):
+        # the partial manifest is not an output: never compressed, listed or merged
+        for _ in range(2):
+            summary = merge_shards(self.build_shards(2, compress=True), self.path("public"))
+            self.assertEqual(([], []), (summary["errors"], summary["conflicts"]))
+        self.assertEqual([], [name for name in os.listdir(self.path("public")) if name.startswith("shard-manifest")])
+        self.assertTrue(os.path.exists(self.path("public", "blog", "post1.html.gz")) or os.path.getsize(self.path("public", "blog", "post1.html")) < 256)
+
+    def test_conflicts_and_missing_shards(self):
+        dirs = self.build_shards(2)
+        other = dirs[1] if os.path.exists(os.path.join(dirs[0], "index.css")) else dirs[0]
+        self.write(os.path.join(other, "index.css"), "body { color: red }")
+        write_partial_manifest(other, (dirs.index(other) + 1, 2), Manifest(self.path(".cache", "unused.json")))
+        summary = merge_shards(dirs, self.path("public"))
+        self.assertEqual(["index.css"], [rel for rel, _, _ in summary["conflicts"]])
+        self.assertFalse(os.path.exists(self.path("public")))
+
+        summary = merge_shards(dirs[:1], self.path("public"))
+        self.assertEqual(["missing shards: 2"], summary["errors"])
+
+    def test_local_processes(self):
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            self.assertEqual(0, run_local(3, ["-q"]))
+            build("static", "content", "template.html", "single", os.path.join(".cache", "manifest.json"))
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(self.read_tree(self.path("single")), self.read_tree(self.path("public")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from template import Template, layout_for, load_template
+from main import extract_front_matter
+
+class TestTemplate(unittest.TestCase):
+    def test_compile(self):
+        template = Template("<title> {{ Title }} </title>{{Content}}!")
+        self.assertEqual(["<title> ", " </title>", "!"], template.literals)
+        self.assertEqual(["Title", "Content"], [slot for slot, _ in template.slots])
+
+    def test_render(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}<p>{{ author }}</p>")
+        result = template.render({"Title": "Hi", "Content": "<p>body</p>", "author": "Bilbo"})
+        self.assertEqual("<h1>Hi</h1><p>body</p><p>Bilbo</p>", result)
+
+    def test_unknown_placeholder_kept(self):
+        template = Template("{{ Title }} {{ missing }}")
+        self.assertEqual("Hi {{ missing }}", template.render({"Title": "Hi"}))
+
+    def test_values_are_not_rescanned(self):
+        template = Template("{{ Content }}")
+        self.assertEqual("{{ Title }}", template.render({"Content": "{{ Title }}", "Title": "Hi"}))
+
+    def test_load_template_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            self.assertIs(load_template(path), load_template(path))
+
+    def test_includes_and_layouts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            def write(name, text):
+                os.makedirs(os.path.dirname(os.path.join(tmp, name)), exist_ok=True)
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write(text)
+
+            write("template.html", '{% include "templates/partials/head.html" %}<main>{% block body %}{{ Content }}{% endblock %}</main>{% block foot %}<p>foot</p>{% endblock %}')
+            write("templates/partials/head.html", "<title>{{ Title }}</title>")
+            write("templates/blog.html", '{% extends "../template.html" %}ignored{% block body %}<article>{{ Content }}</article>{% endblock body %}')
+            write("templates/blog/drafts.html", '{% extends "../blog.html" %}{% block foot %}{% include "../partials/draft.html" %}{% endblock %}')
+            write("templates/partials/draft.html", "<p>draft</p>")
+
+            root = load_template(os.path.join(tmp, "template.html"))
+            self.assertEqual("<title>Hi</title><main>body</main><p>foot</p>", root.render({"Title": "Hi", "Content": "body"}))
+            drafts = load_template(os.path.join(tmp, "templates", "blog", "drafts.html"))
+            self.assertEqual("<title>Hi</title><main><article>body</article></main><p>draft</p>", drafts.render({"Title": "Hi", "Content": "body"}))
+            self.assertEqual([os.path.join(tmp, *name.split("/")) for name in ["templates/blog/drafts.html", "templates/partials/draft.html", "templates/blog.html", "template.html", "templates/partials/head.html"]], drafts.dependencies)
+
+            # a change to any file it was put together from compiles it again
+            self.assertIs(drafts, load_template(os.path.join(tmp, "templates", "blog", "drafts.html")))
+            write("templates/partials/head.html", "<title>{{ Title }}!</title>")
+            path = os.path.join(tmp, "templates", "partials", "head.html")
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            self.assertTrue(load_template(os.path.join(tmp, "templates", "blog", "drafts.html")).render({"Title": "Hi"}).startswith("<title>Hi!</title>"))
+
+            content, layouts, default = os.path.join(tmp, "content"), os.path.join(tmp, "templates"), os.path.join(tmp, "template.html")
+            self.assertEqual(default, layout_for(os.path.join(content, "index.md"), content, default, layouts))
+            self.assertEqual(default, layout_for(os.path.join(content, "about", "index.md"), content, default, layouts))
+            self.assertEqual(os.path.join(layouts, "blog.html"), layout_for(os.path.join(content, "blog", "2024", "post.md"), content, default, layouts))
+            self.assertEqual(os.path.join(layouts, "blog", "drafts.html"), layout_for(os.path.join(content, "blog", "drafts", "post.md"), content, default, layouts))
+
+    def test_include_cycle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, other in [("a.html", "b.html"), ("b.html", "a.html")]:
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write(f'{{% include "{other}" %}}')
+            with self.assertRaisesRegex(Exception, "includes itself"):
+                load_template(os.path.join(tmp, "a.html"))
+
+    def test_front_matter(self):
+        variables, markdown = extract_front_matter("---\nauthor: Bilbo\nTitle: There and Back\n---\n# Hi\n\ntext")
+        self.assertEqual({"author": "Bilbo", "Title": "There and Back"}, variables)
+        self.assertEqual("# Hi\n\ntext", markdown)
+
+    def test_no_front_matter(self):
+        self.assertEqual(({}, "# Hi"), extract_front_matter("# Hi"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import time
 import unittest
 
 from textnode import *
@@ -80,6 +81,76 @@ class TestTextNode(unittest.TestCase):
         result = text_to_textnodes(text)
         self.assertEqual(expected, result)
     
+    def test_tokenize_inline_link_text_with_delimiters(self):
+        result = tokenize_inline("a [*not* italic](https://boot.dev/a*b) b")
+        expected = [
+            TextNode("a ", text_type_text),
+            TextNode("*not* italic", text_type_link, "https://boot.dev/a*b"),
+            TextNode(" b", text_type_text),
+        ]
+        self.assertEqual(expected, result)
+
+    def test_tokenize_inline_many_links(self):
+        text = "".join(f"[{i}](/{i}) " for i in range(5000))
+        result = tokenize_inline(text)
+        self.assertEqual(10000, len(result))
+        self.assertEqual(TextNode("4999", text_type_link, "/4999"), result[-2])
+
+    def test_tokenize_inline_bracket_before_image(self):
+        result = tokenize_inline("see [1] and ![alt](/a.png)")
+        expected = [
+            TextNode("see [1] and ", text_type_text),
+            TextNode("alt", text_type_image, "/a.png"),
+        ]
+        self.assertEqual(expected, result)
+
+    def test_tokenize_inline_bracket_before_code_and_link(self):
+        result = tokenize_inline("see [1] `x` [l](u)")
+        expected = [
+            TextNode("see [1] ", text_type_text),
+            TextNode("x", text_type_code),
+            TextNode(" ", text_type_text),
+            TextNode("l", text_type_link, "u"),
+        ]
+        self.assertEqual(expected, result)
+
+    def test_tokenize_inline_badge(self):
+        result = tokenize_inline("[![Build](https://x/b.svg)](https://ci)")
+        expected = [
+            TextNode("[", text_type_text),
+            TextNode("Build", text_type_image, "https://x/b.svg"),
+            TextNode("](https://ci)", text_type_text),
+        ]
+        self.assertEqual(expected, result)
+        result = tokenize_inline("see [note ![icon](a.png)")
+        expected = [
+            TextNode("see [note ", text_type_text),
+            TextNode("icon", text_type_image, "a.png"),
+        ]
+        self.assertEqual(expected, result)
+
+    def test_tokenize_inline_link_on_one_line(self):
+        self.assertEqual([TextNode("x [a\nb](u)", text_type_text)], tokenize_inline("x [a\nb](u)"))
+        self.assertEqual([TextNode("x [a](u\nv)", text_type_text)], tokenize_inline("x [a](u\nv)"))
+
+    def test_tokenize_inline_unmatched_brackets_are_linear(self):
+        # eight times the input may take about eight times as long, not sixty-four
+        def seconds(count):
+            best = None
+            for _ in range(3):
+                start = time.perf_counter()
+                for text in ["[x] " * count, "[" * count, "[a](" * count, "![" * count, "[a\n" * count]:
+                    self.assertEqual([TextNode(text, text_type_text)], tokenize_inline(text))
+                taken = time.perf_counter() - start
+                best = taken if best is None else min(best, taken)
+            return best
+
+        self.assertLess(seconds(16000), 24 * seconds(2000))
+
+    def test_tokenize_inline_unclosed(self):
+        with self.assertRaises(Exception):
+            tokenize_inline("an **unclosed delimiter")
+
     def test_markdown_to_blocks(self):
         markdown = "This is **bolded** paragraph\n\nThis is another paragraph with *italic* text and `code` here\nThis is the same paragraph on a new line\n\n* This is a list\n* with items"
         expected = [
@@ -101,6 +172,26 @@ class TestTextNode(unittest.TestCase):
         result = markdown_to_blocks(markdown)
         self.assertEqual(expected, result)
     
+    def test_scan_blocks_line_ranges(self):
+        markdown = "# Title\n\nparagraph\nline\n\n```\ncode\n\nmore\n```\n* a\n* b"
+        expected = [
+            Block("# Title", block_type_heading, 1, 1),
+            Block("paragraph\nline", block_type_paragraph, 3, 4),
+            Block("```\ncode\n\nmore\n```", block_type_code, 6, 10),
+            Block("* a\n* b", block_type_unordered_list, 11, 12),
+        ]
+        self.assertEqual(expected, list(scan_blocks(markdown)))
+
+    def test_scan_blocks_from_lines(self):
+        markdown = "para ```inline code``` after\n\n> quote\n"
+        self.assertEqual(list(scan_blocks(markdown)), list(scan_blocks(markdown.splitlines(True))))
+        self.assertEqual(["para", "```inline code```", "after", "> quote"], markdown_to_blocks(markdown))
+
+    def test_markdown_to_document_title(self):
+        node, title = markdown_to_document("## Sub\n\n# Main title\n\n# Second")
+        self.assertEqual("Main title", title)
+        self.assertEqual(3, len(node.children))
+
     def test_text_block_to_block_type(self):
         blocks = [
             "###### Heading",
@@ -0,0 +1,68 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+import unittest
+
+import watch
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        os.makedirs(self.content)
+        self.page = os.path.join(self.content, "index.md")
+        self.write(self.page, "# Home")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def watching(self, **kwargs):
+        delivered, stop = queue.Queue(), threading.Event()
+        thread = threading.Thread(target=watch.watch, args=([self.content], delivered.put), kwargs={"stop": stop, **kwargs})
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+        # for the first snapshot to be taken
+        time.sleep(0.2)
+        return delivered
+
+    def test_edits_and_new_files(self):
+        delivered = self.watching()
+        self.write(self.page, "# Home again")
+        self.assertEqual({self.page}, delivered.get(timeout=5))
+        other = os.path.join(self.content, "other.md")
+        self.write(other, "# Other")
+        self.assertEqual({other}, delivered.get(timeout=5))
+
+    def test_recent_files_polled_between_scans(self):
+        scans = []
+        snapshot = watch.snapshot
+
+        def slow(paths):
+            # a full scan as costly as on a large site: at a 5% share, one a second
+            time.sleep(0.05)
+            scans.append(time.monotonic())
+            return snapshot(paths)
+
+        watch.snapshot = slow
+        try:
+            delivered = self.watching(scan_share=0.05)
+            # the first change is found by a full scan, the next one from the hot set
+            self.write(self.page, "# Home again")
+            self.assertEqual({self.page}, delivered.get(timeout=5))
+            before = len(scans)
+            self.write(self.page, "# Home, a third time")
+            self.assertEqual({self.page}, delivered.get(timeout=0.5))
+            self.assertEqual(before, len(scans))
+        finally:
+            watch.snapshot = snapshot
+
+
+if __name__ == "__main__":
+    unittest.main()
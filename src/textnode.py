@@ -1,6 +1,8 @@
 from htmlnode import LeafNode
 from htmlnode import ParentNode
+import io
 import re
+import sys
 
 text_type_text = "text"
 text_type_bold = "bold"
@@ -14,6 +16,8 @@ italic_delimiter = "*"
 code_delimiter = "`"
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None) -> None:
         self.text = text
         self.text_type = text_type
@@ -117,17 +121,73 @@ def split_nodes_link(old_nodes):
 
     return new_nodes
 
-def text_to_textnodes(text):
-    nodes = [TextNode(text, text_type_text)]
+inline_special_pattern = re.compile(r"[*`!\[]")
+
+def tokenize_inline(text):
+    # one left-to-right scan: jump to the next character that can open a span,
+    # consume the whole span and emit it, everything in between is plain text
+    nodes = []
+    start = pos = 0
+    found = {}
+
+    def next_at(char, after):
+        # the first char at or after after, len(text) when there is none; after
+        # only grows, so a "[" that opens nothing costs no rescan
+        position = found.get(char, -1)
+        if position < after:
+            position = text.find(char, after)
+            position = found[char] = len(text) if position == -1 else position
+        return position
+
+    def flush(end):
+        if end > start and not text[start:end] == "\n":
+            nodes.append(TextNode(text[start:end], text_type_text))
+
+    while True:
+        match = inline_special_pattern.search(text, pos)
+        if not match:
+            break
+        pos = match.start()
+        char = text[pos]
+
+        if char == "!" or char == "[":
+            # [text](url) or ![alt](url) on one line, the text runs to the first
+            # "]"; one that reaches another "[" opens nothing, so the image in
+            # [![badge](b.svg)](url) is still found
+            opening = pos + 1 if char == "!" else pos
+            if text.startswith("[", opening):
+                bracket = next_at("]", opening)
+                newline = next_at("\n", opening + 1)
+                if bracket < min(newline, next_at("[", opening + 1)) and text.startswith("(", bracket + 1):
+                    paren = next_at(")", bracket + 2)
+                    if paren < newline:
+                        flush(pos)
+                        text_type = text_type_image if char == "!" else text_type_link
+                        nodes.append(TextNode(text[opening + 1:bracket], text_type, text[bracket + 2:paren]))
+                        start = pos = paren + 1
+                        continue
+            pos += 1
+            continue
 
-    nodes = split_nodes_delimiter(nodes, bold_delimiter, text_type_bold)
-    nodes = split_nodes_delimiter(nodes, italic_delimiter, text_type_italic)
-    nodes = split_nodes_delimiter(nodes, code_delimiter, text_type_code)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    
+        if text.startswith(bold_delimiter, pos):
+            delimiter, text_type = bold_delimiter, text_type_bold
+        elif char == italic_delimiter:
+            delimiter, text_type = italic_delimiter, text_type_italic
+        else:
+            delimiter, text_type = code_delimiter, text_type_code
+        close = text.find(delimiter, pos + len(delimiter))
+        if close == -1:
+            raise Exception("The delimiter must be closed.")
+        flush(pos)
+        nodes.append(TextNode(text[pos + len(delimiter):close], text_type))
+        start = pos = close + len(delimiter)
+
+    flush(len(text))
     return nodes
 
+def text_to_textnodes(text):
+    return tokenize_inline(text)
+
 block_type_paragraph = "paragraph"
 block_type_heading = "heading"
 block_type_code = "code"
@@ -135,38 +195,105 @@ block_type_quote = "quote"
 block_type_unordered_list = "unordered_list"
 block_type_ordered_list = "ordered_list"
 
-def markdown_to_blocks(markdown):
-    components = []
-    code_components = markdown.split("```")
+heading_pattern = re.compile(r"#{1,6} ")
+code_fence = "```"
 
-    for idx, component in enumerate(code_components):
-        if idx % 2 == 1: # in a code block
-            components.append("```" + component + "```")
-        else:
-            components.extend(component.split("\n\n"))
-    # components = markdown.split("\n\n")
-    components = list(filter(lambda item: not len(item) == 0, map(lambda component: component.strip('\n '), components)))
-    return components
+class Block:
+    __slots__ = ("text", "block_type", "start", "end")
+
+    def __init__(self, text, block_type, start, end) -> None:
+        self.text = text
+        self.block_type = block_type
+        # first and last source line of the block, 1-based and inclusive
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"Block({self.block_type}, {self.start}-{self.end}, {self.text!r})"
+
+    def __eq__(self, value: object) -> bool:
+        return self.text == value.text and self.block_type == value.block_type and self.start == value.start and self.end == value.end
+
+def scan_blocks(markdown):
+    # markdown is a string or any iterable of lines such as an open file. Blocks
+    # are separated by empty lines, and a ``` fence opens a code block wherever
+    # it appears, running to the next fence even across empty lines.
+    lines = io.StringIO(markdown) if isinstance(markdown, str) else markdown
+    text_lines, code_parts = [], None
+    start = lineno = 0
+
+    def text_block(end):
+        text = "\n".join(text_lines).strip("\n ")
+        text_lines.clear()
+        if text:
+            return Block(text, block_to_block_type(text), start, end)
+
+    for lineno, line in enumerate(lines, 1):
+        newline = line.endswith("\n")
+        rest = line[:-1] if newline else line
+        while True:
+            if code_parts is not None:
+                close = rest.find(code_fence)
+                if close == -1:
+                    code_parts.append(rest + "\n" if newline else rest)
+                    break
+                code_parts.append(rest[:close + len(code_fence)])
+                yield Block("".join(code_parts).strip("\n "), block_type_code, start, lineno)
+                code_parts, start, rest = None, lineno, rest[close + len(code_fence):]
+                continue
+
+            fence = rest.find(code_fence)
+            if fence == -1:
+                if rest == "":
+                    block = text_block(lineno - 1)
+                    if block:
+                        yield block
+                else:
+                    if not text_lines:
+                        start = lineno
+                    text_lines.append(rest)
+                break
+
+            if not text_lines:
+                start = lineno
+            text_lines.append(rest[:fence])
+            block = text_block(lineno)
+            if block:
+                yield block
+            code_parts, start, rest = [code_fence], lineno, rest[fence + len(code_fence):]
+
+    if code_parts is not None:
+        code_parts.append(code_fence)
+        yield Block("".join(code_parts).strip("\n "), block_type_code, start, lineno)
+    else:
+        block = text_block(lineno)
+        if block:
+            yield block
+
+def markdown_to_blocks(markdown):
+    return [block.text for block in scan_blocks(markdown)]
 
 def block_to_block_type(block):
-    def isOrderedList(block):
-        lines = block.split("\n")
-        for idx, line in enumerate(lines):
-            if not line.startswith(f"{idx + 1}."):
-                return False
-        return True
-
-    if re.split(r"^#{1,6} ", block)[0] == "":
+    if heading_pattern.match(block) or block == "":
         return block_type_heading
     elif block.startswith("`") and block.endswith("`"):
         return block_type_code
-    elif len(list(filter(lambda line: not line.startswith(">"), block.split("\n")))) == 0:
+
+    # one pass over the lines decides between quote and the two list types
+    quote = unordered = ordered = True
+    for idx, line in enumerate(block.split("\n")):
+        quote = quote and line.startswith(">")
+        unordered = unordered and (line.startswith("*") or line.startswith("-"))
+        ordered = ordered and line.startswith(f"{idx + 1}.")
+        if not (quote or unordered or ordered):
+            break
+
+    if quote:
         return block_type_quote
-    elif len(list(filter(lambda line: not (line.startswith("*") or line.startswith("-")), block.split("\n")))) == 0:
+    elif unordered:
         return block_type_unordered_list
-    elif isOrderedList(block):
+    elif ordered:
         return block_type_ordered_list
-
     return block_type_paragraph
 
 def heading_block_to_htmlnode(block):
@@ -177,7 +304,7 @@ def heading_block_to_htmlnode(block):
     lines = re.split(r"^#{1,6} ", block)
     for line in list(filter(lambda line: not len(line) == 0, lines)):
         parents.append(ParentNode("p", list(map(lambda node: text_node_to_html_node(node), text_to_textnodes(line)))))
-    return ParentNode(f"h{h_num}", parents)
+    return ParentNode(sys.intern(f"h{h_num}"), parents)
 
 def code_block_to_htmlnode(block):
     return ParentNode("pre", [LeafNode("code", block.strip('`'))])
@@ -212,19 +339,51 @@ def paragraph_block_to_htmlnode(block):
 
     return ParentNode("p", children)
 
+def block_to_html_node(block, type):
+    if type == block_type_heading:
+        return heading_block_to_htmlnode(block)
+    elif type == block_type_code:
+        return code_block_to_htmlnode(block)
+    elif type == block_type_quote:
+        return quote_block_to_htmlnode(block)
+    elif type == block_type_unordered_list:
+        return unordered_list_block_to_htmlnode(block)
+    elif type == block_type_ordered_list:
+        return ordered_list_block_to_htmlnode(block)
+    return paragraph_block_to_htmlnode(block)
+
+def block_title(block):
+    if block.block_type == block_type_heading and block.text.startswith("# "):
+        return block.text.removeprefix("# ")
+    return None
+
+def block_to_document_node(block, cache=None, assets=None):
+    # with a BlockCache, blocks seen before become leaves holding their cached
+    # HTML, with assets (an assets.Assets) image and link urls point at fingerprinted files
+    if cache is None:
+        node = block_to_html_node(block.text, block.block_type)
+        return assets.rewrite_node(node) if assets else node
+    key = cache.key(block.text, block.block_type, assets.version if assets else "")
+    html = cache.get(key)
+    if html is None:
+        node = block_to_html_node(block.text, block.block_type)
+        html = (assets.rewrite_node(node) if assets else node).to_html()
+        cache.put(key, html)
+    return LeafNode(None, html)
+
+def markdown_to_document(markdown, cache=None, assets=None):
+    # the page's node and its first h1, both taken from a single scan
+    children, title = [], None
+    for block in scan_blocks(markdown):
+        if title is None:
+            title = block_title(block)
+        children.append(block_to_document_node(block, cache, assets))
+    return ParentNode("div", children), title
+
+def stream_document(lines, cache=None, assets=None):
+    # the page's node with its blocks parsed lazily from lines (an open file),
+    # each one only while it is being written out
+    return ParentNode("div", (block_to_document_node(block, cache, assets) for block in scan_blocks(lines)))
+
 def markdown_to_html_node(markdown):
-    def getHTMLNode(block):
-        type = block_to_block_type(block)
-        if type == block_type_heading:
-            return heading_block_to_htmlnode(block)
-        elif type == block_type_code:
-            return code_block_to_htmlnode(block)
-        elif type == block_type_quote:
-            return quote_block_to_htmlnode(block)
-        elif type == block_type_unordered_list:
-            return unordered_list_block_to_htmlnode(block)
-        elif type == block_type_ordered_list:
-            return ordered_list_block_to_htmlnode(block)
-        return paragraph_block_to_htmlnode(block)
-    
-    return ParentNode("div", list(map(getHTMLNode, markdown_to_blocks(markdown))))
\ No newline at end of file
+    return markdown_to_document(markdown)[0]
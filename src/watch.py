@@ -0,0 +1,85 @@
+from collections import OrderedDict
+import os
+import time
+
+def snapshot(paths):
+    # path -> (size, mtime) for every file under paths, joined the same way
+    # find_files joins them so the keys match build's source paths
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            st = os.stat(path)
+            files[path] = (st.st_size, st.st_mtime_ns)
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                src = os.path.join(root, name)
+                try:
+                    st = os.stat(src)
+                except FileNotFoundError:
+                    continue
+                files[src] = (st.st_size, st.st_mtime_ns)
+    return files
+
+def changed_paths(old, new):
+    return set(path for path in old.keys() | new.keys() if old.get(path) != new.get(path))
+
+def stat_entry(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def watch(paths, on_change, interval=0.02, debounce=0.03, stop=None, scan_share=0.2, hot_size=64):
+    # stat polling, no dependencies; a burst of changes (an editor saving
+    # several files, a git checkout) is delivered as one set once it has been
+    # quiet for debounce seconds. A full scan costs time in proportion to the
+    # tree, so it runs at most scan_share of the time: every interval on a
+    # small site, every few seconds on a very large one. In between, the
+    # hot_size files that changed last are polled every interval, which keeps
+    # the edit, save, reload loop on the page being worked on fast.
+    start = time.monotonic()
+    current = snapshot(paths)
+    next_scan = start + (time.monotonic() - start) / scan_share
+    hot = OrderedDict()
+
+    def poll():
+        nonlocal current, next_scan
+        start = time.monotonic()
+        if start >= next_scan:
+            latest = snapshot(paths)
+            next_scan = start + (time.monotonic() - start) / scan_share
+            changed = changed_paths(current, latest)
+            current = latest
+        else:
+            changed = set()
+            for path in hot:
+                entry = stat_entry(path)
+                if current.get(path) != entry:
+                    changed.add(path)
+                    if entry is None:
+                        current.pop(path, None)
+                    else:
+                        current[path] = entry
+        for path in changed:
+            hot[path] = True
+            hot.move_to_end(path)
+        while len(hot) > hot_size:
+            hot.popitem(last=False)
+        return changed
+
+    while not (stop and stop.is_set()):
+        time.sleep(interval)
+        changed = poll()
+        if not changed:
+            continue
+
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < debounce:
+            time.sleep(interval)
+            more = poll()
+            if more:
+                changed |= more
+                quiet_since = time.monotonic()
+        on_change(changed)